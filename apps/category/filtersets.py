@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import django_filters
+from django import forms
 from apps.category.models import Category
 
 
@@ -7,4 +8,41 @@ class CategoryFilterSet(django_filters.FilterSet):
 
     class Meta:
         model = Category
-        fields = ['model']
\ No newline at end of file
+        fields = ['model']
+
+
+class CategoryFilter(django_filters.Filter):
+    """Filters the objects of a category, by its id, through the many to many field of the name.
+
+    With include_descendants, the objects of its descendants are kept too. They are the categories of the same tree
+    whose left value is between the left and right values of the category, found by a range of the links to them.
+    The category is looked up among the ones of the owner of the tenant context, set by TenantFilterBackend.
+    """
+    field_class = forms.IntegerField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('name', 'categories')
+        super(CategoryFilter, self).__init__(*args, **kwargs)
+        self.include_descendants = False
+        self.tenant_context = None
+
+    def filter(self, qs, value):
+        if value is None:
+            return qs
+        if not self.include_descendants:
+            return qs.filter(**{self.name: value})
+        if self.tenant_context is None:
+            return qs.none()
+        categories = Category.objects.filter(pk=value, owner=self.tenant_context.owner_id)
+        try:
+            tree_id, lft, rght = categories.values_list('tree_id', 'lft', 'rght').get()
+        except Category.DoesNotExist:
+            return qs.none()
+        field = self.model._meta.get_field(self.name)
+        category = field.m2m_reverse_field_name()
+        links = field.rel.through.objects.filter(**{
+            '{0}__tree_id'.format(category): tree_id,
+            '{0}__lft__range'.format(category): (lft, rght),
+        })
+        # A semi join keeps each object once, however many of the categories it is in
+        return qs.filter(pk__in=links.values(field.m2m_field_name()))
@@ -1,10 +1,20 @@
 from django.db import models
+from django.db.models.signals import m2m_changed, post_save, post_delete, post_migrate
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
-from apps.resource.models import Resource
+from apps.resource.cache import invalidate_category_counts, invalidate_category_trees
+from apps.resource.indexes import register_composite_indexes, register_prefix_indexes
+from apps.resource.models import Resource, Site, AuthorRestriction, AuthUser, connect_relation_receivers
+
+# Fields rendered by category trees, or placing categories in them
+TREE_FIELDS = frozenset(['name', 'parent', 'model', 'lft', 'rght', 'tree_id', 'level'])
+
+# Fields of the items of categories deciding whether they are counted as published
+PUBLICATION_DATE_FIELDS = frozenset(['publication_start_date', 'publication_end_date'])
 
 
 class Category(MPTTModel, Resource):
@@ -30,4 +40,76 @@ class Category(MPTTModel, Resource):
 
     class Meta(MPTTModel.Meta, Resource.Meta):
         verbose_name = _('category')
-        verbose_name_plural = _('categories')
\ No newline at end of file
+        verbose_name_plural = _('categories')
+
+
+# Descendants of a category are the categories of its tree in the range of its left and right values
+register_composite_indexes(Category, ('tree_id', 'lft'))
+register_prefix_indexes(Category, 'name')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Saves of loaded categories only update their changed fields
+    if created or update_fields is None or TREE_FIELDS.intersection(update_fields):
+        invalidate_category_trees(instance.owner_id)
+        invalidate_category_counts(instance.owner_id)
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+@receiver(post_save, sender=AuthorRestriction)
+@receiver(post_delete, sender=AuthorRestriction)
+def category_scope_changed(sender, instance, **kwargs):
+    # Trees and counts are filtered by the site and the author restrictions of the request
+    invalidate_category_trees(instance.owner_id)
+    invalidate_category_counts(instance.owner_id)
+
+
+@receiver(m2m_changed, sender=Resource.sites.through)
+@receiver(m2m_changed, sender=AuthorRestriction.authors.through)
+@receiver(m2m_changed, sender=AuthUser.groups.through)
+def category_scope_relations_changed(sender, instance, action, **kwargs):
+    # Sites of categories and items, the authors of restrictions and the groups restricting users are linked after
+    # their objects are saved. Related objects without an owner, as sites and users, may change every owner.
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        owner_id = getattr(instance, 'owner_id', None)
+        invalidate_category_trees(owner_id)
+        invalidate_category_counts(owner_id)
+
+
+@receiver(post_migrate)
+def categories_reset(sender, **kwargs):
+    invalidate_category_trees()
+    invalidate_category_counts()
+
+
+def track_category_counts(model):
+    """Drops the cached item counts of the categories of an owner when the items of the model in them change, and
+    the cached lists and responses of the owner when the categories of its items change.
+
+    The model must have a "categories" many to many field, and may have publication dates.
+    """
+    m2m_changed.connect(categorized_links_changed, sender=model.categories.through)
+    connect_relation_receivers(model.categories.through)
+    # Publication dates may be saved through a parent model, as when publications are published
+    for sender in [model] + list(model._meta.get_parent_list()):
+        post_save.connect(categorized_item_saved, sender=sender)
+    post_delete.connect(categorized_item_deleted, sender=model)
+
+
+def categorized_links_changed(sender, instance, action, **kwargs):
+    # The instance is the item, or the category when the links are changed from it
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_category_counts(instance.owner_id)
+
+
+def categorized_item_saved(sender, instance, created, update_fields=None, **kwargs):
+    # New items are in no category until their links are added
+    if not created and (update_fields is None or PUBLICATION_DATE_FIELDS.intersection(update_fields)):
+        invalidate_category_counts(instance.owner_id)
+
+
+def categorized_item_deleted(sender, instance, **kwargs):
+    invalidate_category_counts(instance.owner_id)
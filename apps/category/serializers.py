@@ -3,18 +3,28 @@ from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
 from apps.category.models import Category
+from apps.resource.context import get_tenant_context
+from apps.resource.relations import HyperlinkedIdentityField
 from apps.resource.serializers import ResourceSerializer
 
 
+class NestedCategorySerializer(serializers.Serializer):
+    # A model serializer of categories can't be read only, as their owner and author are required and not editable
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(label=_('name'), read_only=True)
+    parent = serializers.PrimaryKeyRelatedField(label=_('parent category'), read_only=True)
+
+
 class CategorySerializer(ResourceSerializer):
-    get_descendants = serializers.HyperlinkedIdentityField(label=_('get descendants'),
-                                                           view_name='category-get-descendants')
+    get_descendants = HyperlinkedIdentityField(label=_('get descendants'),
+                                               view_name='category-get-descendants')
     is_leaf_node = serializers.Field(label=_('is leaf node'), source='category.is_leaf_node')
     model = serializers.PrimaryKeyRelatedField()
 
     def get_fields(self):
         fields = super(CategorySerializer, self).get_fields()
-        fields['parent'].queryset = fields['parent'].queryset.filter(owner=self.context['request'].user.user.owner)
+        fields['parent'].queryset = fields['parent'].queryset.filter(
+            owner=get_tenant_context(self.context['request']).owner_id)
         return fields
 
     class Meta(ResourceSerializer.Meta):
@@ -4,6 +4,9 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
 from rest_framework import status
 
+from apps.category.models import Category
+from test_routines import request_within_budget
+
 
 def test_add_category_routine(test_case, name='Category 1'):
     data2 = copy(test_case.data)
@@ -40,4 +43,44 @@ def test_filter_categories_routine(test_case):
     category_filter3 = {'categories': ['Category 1', 'Category 2']}
     response3 = test_case.client.get(test_case.url, category_filter3)
     # TODO Check why multiple filter is not working
-    #test_case.assertEqual(2, response3.data['count'], response3.data)
\ No newline at end of file
+    #test_case.assertEqual(2, response3.data['count'], response3.data)
+
+
+def test_filter_category_descendants_routine(test_case):
+    model_content_type = ContentType.objects.get_for_model(test_case.model)
+    category_url = reverse('category-list')
+    parent_url = None
+    for name in ('Sports', 'Football', 'Cup'):
+        response = test_case.client.post(category_url, {'name': name, 'model': model_content_type.id,
+                                                        'parent': parent_url})
+        test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+        parent_url = response.data['url']
+        data = copy(test_case.data)
+        data.update({'title': '{0} {1}'.format(test_case.data['title'], name), 'categories': [parent_url]})
+        response = test_case.client.post(test_case.url, data)
+        test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    sports, football, cup = [Category.objects.get(name=name).pk for name in ('Sports', 'Football', 'Cup')]
+
+    # Without include_descendants, only the publications of the category itself are kept
+    response = request_within_budget(test_case, 'get', test_case.url, {'category': football})
+    test_case.assertEqual(1, response.data['count'], response.data)
+
+    # The publications of the descendants are found by the range of the category in its tree, each once
+    data = copy(test_case.data)
+    data.update({'title': '{0} Both'.format(test_case.data['title']),
+                 'categories': [reverse('category-detail', args=[cup]), reverse('category-detail', args=[football])]})
+    test_case.client.post(test_case.url, data)
+    for category, count in ((sports, 4), (football, 3), (cup, 2)):
+        response = request_within_budget(test_case, 'get', test_case.url,
+                                         {'category': category, 'include_descendants': 'true'})
+        test_case.assertEqual(count, response.data['count'], response.data)
+    response = test_case.client.get(test_case.url, {'category': 0, 'include_descendants': 'true'})
+    test_case.assertEqual(0, response.data['count'], response.data)
+
+    # The categories of other owners are not looked up, even for their own items linked to them
+    test_case.set_authorization_bearer(test_case.second_owner_token)
+    response = test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    test_case.model.objects.get(pk=response.data['url'].split('/')[-2]).categories.add(cup)
+    response = test_case.client.get(test_case.url, {'category': sports, 'include_descendants': 'true'})
+    test_case.assertEqual(0, response.data['count'], response.data)
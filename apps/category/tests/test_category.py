@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from copy import copy
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User as AuthUser
 from django.http.request import HttpRequest
@@ -9,11 +11,14 @@ from django.core.exceptions import ValidationError
 from rest_framework.test import APILiveServerTestCase
 from apps.resource.models import Resource, User
 from apps.publication.models import Publication
+from apps.news.models import News
+from apps.file_explorer.models import File
 from apps.category.models import Category
 from apps.category.serializers import CategorySerializer
 from apps.category.views import CategoryViewSet
 from apps.resource.tests import routines as resource_routines
 import test_routines
+from test_routines import request_within_budget
 import test_fixtures
 
 
@@ -103,6 +108,27 @@ class CategoryAPITestCase(APILiveServerTestCase):
     def test_resource_permission(self):
         test_routines.test_resource_permission_routine(self)
 
+    def test_resource_bulk_methods(self):
+        resource_routines.test_resource_bulk_methods_routine(self)
+
+    def test_resource_cursor_pagination(self):
+        resource_routines.test_resource_cursor_pagination_routine(self)
+
+    def test_resource_list_count_cache(self):
+        resource_routines.test_resource_list_count_cache_routine(self)
+
+    def test_resource_conditional_get(self):
+        resource_routines.test_resource_conditional_get_routine(self)
+
+    def test_resource_response_cache(self):
+        resource_routines.test_resource_response_cache_routine(self)
+
+    def test_resource_sparse_fields(self):
+        resource_routines.test_resource_sparse_fields_routine(self, 'name')
+
+    def test_resource_autocomplete(self):
+        resource_routines.test_resource_autocomplete_routine(self, 'name', ['Zeta', 'zeta news', 'Beta'])
+
     def test_admin_permission(self):
         test_routines.test_admin_permission_routine(self)
 
@@ -178,4 +204,96 @@ class CategoryAPITestCase(APILiveServerTestCase):
         request.user = self.second_owner
         possible_parents = CategorySerializer(context={'request': request}).get_fields()['parent'].queryset
         self.assertNotIn(('Category 1', ), possible_parents.values_list('name'))
-        self.assertIn(other_user_category, possible_parents)
\ No newline at end of file
+        self.assertIn(other_user_category, possible_parents)
+
+    def test_tree(self):
+        root_url = self.first_object_response.data['url']
+        children_data = copy(self.data)
+        children_data.update({'parent': root_url, 'name': 'Category 2'})
+        child = self.client.post(self.url, children_data).data
+        children_data.update({'parent': child['url'], 'name': 'Category 3'})
+        grandchild = self.client.post(self.url, children_data).data
+        tree_url = reverse('category-tree')
+        root_id, child_id, grandchild_id = [Category.objects.get(name=name).pk
+                                            for name in ('Category 1', 'Category 2', 'Category 3')]
+
+        # Categories are nested under their parents
+        response = request_within_budget(self, 'get', tree_url)
+        self.assertEqual(200, response.status_code, response.data)
+        grandchild_node = {'id': grandchild_id, 'name': 'Category 3', 'children': []}
+        child_node = {'id': child_id, 'name': 'Category 2', 'children': [grandchild_node]}
+        tree = [{'id': root_id, 'name': 'Category 1', 'children': [child_node]}]
+        self.assertEqual(tree, response.data)
+        self.assertEqual([child_node], self.client.get(tree_url, {'root': child_id}).data)
+        self.assertEqual(404, self.client.get(tree_url, {'root': 0}).status_code)
+
+        # Trees are cached until categories are renamed or moved
+        with CaptureQueriesContext(connection) as context:
+            cached_response = self.client.get(tree_url)
+        self.assertEqual(response.data, cached_response.data)
+        table = Category._meta.db_table
+        self.assertEqual([], [query for query in context.captured_queries if table in query['sql']])
+        self.client.patch(grandchild['url'], {'name': 'Category 4'})
+        grandchild_node['name'] = 'Category 4'
+        self.assertEqual(tree, self.client.get(tree_url).data)
+        self.client.patch(grandchild['url'], {'parent': root_url})
+        child_node['children'] = []
+        self.assertEqual([{'id': root_id, 'name': 'Category 1', 'children': [child_node, grandchild_node]}],
+                         self.client.get(tree_url).data)
+
+        # Trees are dropped when the sites of the categories change
+        Category.objects.get(pk=root_id).sites.clear()
+        self.assertNotIn(root_id, [node['id'] for node in self.client.get(tree_url).data])
+
+        # Other owners do not see the categories
+        self.set_authorization_bearer(self.second_owner_token)
+        self.assertEqual([], self.client.get(tree_url).data)
+
+    def test_counts(self):
+        root_url = self.first_object_response.data['url']
+        children_data = copy(self.data)
+        children_data.update({'parent': root_url, 'name': 'Category 2'})
+        self.client.post(self.url, children_data)
+        root, child = [Category.objects.get(name=name) for name in ('Category 1', 'Category 2')]
+        sites = list(root.sites.all())
+        items = []
+        for model, title, author, item_sites, categories in (
+                (News, 'First news', self.owner, sites, [root, child]),
+                (News, 'Second news', self.owner, sites, [child]),
+                (File, 'File', self.owner, sites, [child]),
+                # Items the lists do not show to the request are not counted either
+                (News, 'News of another site', self.owner, [], [child]),
+                (News, 'News of another author', self.account_user, sites, [child])):
+            item = model.objects.create(owner=self.owner, author=author, title=title)
+            item.sites = item_sites
+            item.categories = categories
+            items.append(item)
+        first_news, second_news = items[:2]
+        counts_url = reverse('category-counts')
+
+        # Items of the descendants are counted in their ancestors, each once
+        response = request_within_budget(self, 'get', counts_url)
+        self.assertEqual(200, response.status_code, response.data)
+        self.assertEqual([{'id': root.pk, 'news': 2, 'files': 1}, {'id': child.pk, 'news': 2, 'files': 1}],
+                         response.data)
+        self.assertEqual([{'id': child.pk, 'news': 2, 'files': 1}],
+                         self.client.get(counts_url, {'root': child.pk}).data)
+
+        # Counts are cached until the items of the categories change
+        with CaptureQueriesContext(connection) as context:
+            cached_response = self.client.get(counts_url)
+        self.assertEqual(response.data, cached_response.data)
+        table = Category._meta.db_table
+        self.assertEqual([], [query for query in context.captured_queries if table in query['sql']])
+        second_news.unpublish()
+        self.assertEqual([{'id': root.pk, 'news': 1, 'files': 1}, {'id': child.pk, 'news': 1, 'files': 1}],
+                         self.client.get(counts_url, {'published': 'true'}).data)
+        root.news.remove(first_news)
+        self.assertEqual([{'id': root.pk, 'news': 2, 'files': 1}, {'id': child.pk, 'news': 2, 'files': 1}],
+                         self.client.get(counts_url).data)
+        first_news.categories.clear()
+        self.assertEqual([{'id': root.pk, 'news': 1, 'files': 1}, {'id': child.pk, 'news': 1, 'files': 1}],
+                         self.client.get(counts_url).data)
+        second_news.delete()
+        self.assertEqual([{'id': root.pk, 'news': 0, 'files': 1}, {'id': child.pk, 'news': 0, 'files': 1}],
+                         self.client.get(counts_url).data)
@@ -1,17 +1,74 @@
 # Create your views here.
+from collections import OrderedDict
+
+from django.db import connections
+from django.http import Http404
 from rest_framework.decorators import link
 from rest_framework.response import Response
 
 from apps.category.models import Category
 from apps.category.filtersets import CategoryFilterSet
 from apps.category.serializers import CategorySerializer
-from apps.resource.views import ResourceViewSet
+from apps.resource.backends import AuthorRestrictionBackend, ResourceFilterBackend, SiteDomainFilterBackend
+from apps.resource.cache import get_category_counts, get_category_tree, set_category_counts, set_category_tree
+from apps.resource.context import get_tenant_context
+from apps.resource.views import AutocompleteMixin, ResourceViewSet
+
+
+def build_tree(nodes):
+    """Nests the (id, name, parent id) nodes of categories, ordered by tree and left value, in one pass.
+
+    Categories whose parent is not among the nodes are roots.
+    """
+    categories = {}
+    roots = []
+    for category_id, name, parent_id in nodes:
+        category = categories[category_id] = {'id': category_id, 'name': name, 'children': []}
+        if parent_id in categories:
+            categories[parent_id]['children'].append(category)
+        else:
+            roots.append(category)
+    return roots
+
+
+def select_item_counts(queryset, items):
+    """Selects the number of items of each many to many relation of the categories, by its related name, counting
+    the items of the category and of its descendants once, as "<name>_count".
+
+    Only the items of the queryset given for each related name are counted. Each count is a subquery of the links to
+    the categories in the range of the left and right values of the category, in its tree.
+    """
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    opts = queryset.model._meta
+    table = quote_name(opts.db_table)
+    tree_id, lft, rght = [quote_name(opts.get_field(name).column) for name in ('tree_id', 'lft', 'rght')]
+    select = OrderedDict()
+    params = []
+    for name, item_queryset in items.items():
+        field = opts.get_field_by_name(name)[0].field
+        item_column = quote_name(field.m2m_column_name())
+        item_sql, item_params = item_queryset.values('pk').query.sql_with_params()
+        select['{0}_count'.format(name)] = (
+            '(SELECT COUNT(DISTINCT link.{0}) FROM {1} link INNER JOIN {2} descendant ON descendant.{3} = link.{4} '
+            'WHERE descendant.{5} = {2}.{5} AND descendant.{6} BETWEEN {2}.{6} AND {2}.{7} AND link.{0} IN ({8}))'
+        ).format(item_column, quote_name(field.m2m_db_table()), table, quote_name(opts.pk.column),
+                 quote_name(field.m2m_reverse_name()), tree_id, lft, rght, item_sql)
+        params.extend(item_params)
+    return queryset.extra(select=select, select_params=params)
 
 
-class CategoryViewSet(ResourceViewSet):
+class CategoryViewSet(AutocompleteMixin, ResourceViewSet):
     serializer_class = CategorySerializer
     model = Category
     filter_class = CategoryFilterSet
+    cache_responses = True
+    autocomplete_field = 'name'
+    query_budget = dict(ResourceViewSet.query_budget, list=13, destroy=18, get_descendants=9, tree=7, counts=7)
+    # Related names of the items counted in the categories
+    counted_items = ('news', 'files')
+    # Backends scoping the counted items as the lists of their models are scoped
+    item_filter_backends = (ResourceFilterBackend, SiteDomainFilterBackend, AuthorRestrictionBackend)
 
     @link()
     def get_descendants(self, request, *agrs, **kwargs):
@@ -19,4 +76,64 @@ class CategoryViewSet(ResourceViewSet):
         category = self.get_object()
         return Response(
             {'descendants': CategorySerializer(category.get_descendants(), context={'request': request, 'view': self},
-                                               many=True).data})
\ No newline at end of file
+                                               many=True).data})
+
+    def tree(self, request, *args, **kwargs):
+        """Returns the categories as nested ids, names and children, from the roots of their trees.
+
+        The "root" query parameter returns the subtree of a category instead. Trees are read with a range query of
+        the tree ids and left values, and cached until the categories of the owner are renamed or moved.
+        """
+        owner_id = get_tenant_context(request).owner_id
+        fingerprint = self.get_response_fingerprint()
+        tree = get_category_tree(owner_id, fingerprint)
+        if tree is None:
+            tree = build_tree(self.get_tree_queryset().values_list('id', 'name', 'parent'))
+            set_category_tree(owner_id, fingerprint, tree)
+        return Response(tree)
+
+    def counts(self, request, *args, **kwargs):
+        """Returns the ids of the categories with the numbers of their news and files, including the ones of their
+        descendants.
+
+        The "root" query parameter counts the subtree of a category, and "published=true" only counts the items
+        published now. Counts are read with one query, and cached until the items of the categories of the owner
+        change.
+        """
+        owner_id = get_tenant_context(request).owner_id
+        fingerprint = self.get_response_fingerprint()
+        counts = get_category_counts(owner_id, fingerprint)
+        if counts is None:
+            items = OrderedDict((name, self.get_items_queryset(name)) for name in self.counted_items)
+            queryset = select_item_counts(self.get_tree_queryset(), items)
+            columns = ['{0}_count'.format(name) for name in self.counted_items]
+            counts = [dict(zip(('id',) + self.counted_items, row)) for row in queryset.values_list('id', *columns)]
+            set_category_counts(owner_id, fingerprint, counts)
+        return Response(counts)
+
+    def get_items_queryset(self, name):
+        """Returns the items of a relation of the categories that the lists of their model show to the request.
+
+        Those are the items of the owner, of the request site and of the authors the user may read. With
+        "published=true", only the items published now are kept.
+        """
+        model = Category._meta.get_field_by_name(name)[0].model
+        queryset = model._default_manager.all()
+        view = ResourceViewSet(request=self.request, model=model)
+        for backend in self.item_filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, view)
+        if self.request.QUERY_PARAMS.get('published') == 'true':
+            queryset = queryset.published()
+        return queryset
+
+    def get_tree_queryset(self):
+        """Returns the filtered categories ordered by tree and left value, or the subtree of the "root" category."""
+        queryset = self.filter_queryset(Category.objects.all())
+        root_id = self.request.QUERY_PARAMS.get('root')
+        if root_id:
+            try:
+                root = queryset.filter(pk=root_id).values('tree_id', 'lft', 'rght').get()
+            except (Category.DoesNotExist, ValueError):
+                raise Http404
+            queryset = queryset.filter(tree_id=root['tree_id'], lft__gte=root['lft'], rght__lte=root['rght'])
+        return queryset.order_by('tree_id', 'lft')
@@ -5,20 +5,21 @@ from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.db import models
 from apps.category.models import Category
-from apps.publication.models import Publication
+from apps.publication.models import Publication, PublicationQuerySet
 
 
 class Page(Publication):
     category = models.OneToOneField(Category, editable=False)
 
+    objects = PublicationQuerySet.as_manager()
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
-        try:
-            self.category
-        except Category.DoesNotExist:
+        if self.category_id is None:
             self.category = Category.objects.create(name=self.slug, author=self.author, owner=self.owner,
                                                     model=ContentType.objects.get_for_model(Page))
-        super(Page, self).save()
+        super(Page, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                               update_fields=update_fields)
 
     class Meta(Publication.Meta):
         verbose_name = _('pages')
@@ -32,6 +33,8 @@ class Module(Publication):
     filters = models.TextField(blank=True)
     pages = models.ManyToManyField(Page, related_name='modules', through='ModulePosition')
 
+    objects = PublicationQuerySet.as_manager()
+
     class Meta(Publication.Meta):
         verbose_name = _('module')
         verbose_name_plural = _('modules')
@@ -44,6 +47,8 @@ class ModulePosition(Publication):
         ('1', _('Top')), ('2', _('Left')), ('3', _('Center')), ('4', _('Right')), ('5', _('Bottom'))))
     order = models.IntegerField()
 
+    objects = PublicationQuerySet.as_manager()
+
     class Meta(Publication.Meta):
         verbose_name = _('position')
         verbose_name_plural = _('positions')
\ No newline at end of file
@@ -9,6 +9,7 @@ except ImportError:
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
+from apps.resource.relations import HyperlinkedRelatedField
 from apps.publication.serializers import PublicationSerializer
 from apps.cms.models import Page, Module, ModulePosition
 
@@ -47,10 +48,12 @@ class ModuleSerializer(PublicationSerializer):
 
     class Meta(PublicationSerializer.Meta):
         model = Module
+        select_related = ('model',)
+        field_dependencies = dict(PublicationSerializer.Meta.field_dependencies, content_url=('filters', 'model'))
 
 
 class PageSerializer(PublicationSerializer):
-    category = serializers.HyperlinkedRelatedField(view_name='category-detail', read_only=True, label=_('category'))
+    category = HyperlinkedRelatedField(view_name='category-detail', read_only=True, label=_('category'))
     content = serializers.CharField(required=False, label=_('content'), widget=serializers.widgets.Textarea())
 
     def get_fields(self):
@@ -43,6 +43,9 @@ class PageTestCase(LiveServerTestCase):
     def test_serializer_get_fields_method(self):
         page_serializer = PageSerializer(context={'request': self.request})
         self.assertTrue(isinstance(page_serializer.get_fields()['modules'], ModuleSerializer))
+        # Each page serializer has its own serializer of the modules
+        modules_serializer = page_serializer.fields['modules']
+        self.assertIsNot(modules_serializer, PageSerializer(context={'request': self.request}).fields['modules'])
 
 
 class PageAPITestCase(APILiveServerTestCase):
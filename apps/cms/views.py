@@ -11,17 +11,18 @@ class PageViewSet(PublicationBaseViewSet):
     serializer_class = PageSerializer
     model = Page
     filter_class = PageFilterSet
+    cache_responses = True
 
     def post_save(self, obj, created=False):
         super(PageViewSet, self).post_save(obj, created=created)
         obj.category.sites = obj.sites.all()
-        obj.save()
 
 
 class ModuleViewSet(PublicationBaseViewSet):
     serializer_class = ModuleSerializer
     model = Module
     filter_class = ModuleFilterSet
+    cache_responses = True
 
 
 class ModulePositionViewSet(PublicationBaseViewSet):
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
-from apps.publication.filtersets import PublicationFilterSet
+from apps.publication.filtersets import CategorizedPublicationFilterSet
 from apps.file_explorer.models import File
 
 
-class FileFilterSet(PublicationFilterSet):
+class FileFilterSet(CategorizedPublicationFilterSet):
 
-    class Meta(PublicationFilterSet.Meta):
+    class Meta(CategorizedPublicationFilterSet.Meta):
         model = File
\ No newline at end of file
@@ -1,8 +1,8 @@
 import os
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
-from apps.category.models import Category
-from apps.publication.models import Publication
+from apps.category.models import Category, track_category_counts
+from apps.publication.models import Publication, PublicationQuerySet
 from settings.common import MEDIA_ROOT
 
 
@@ -18,6 +18,8 @@ class File(Publication):
     categories = models.ManyToManyField(Category, verbose_name=_('categories'), null=True, blank=True,
                                         related_name='files')
 
+    objects = PublicationQuerySet.as_manager()
+
     def __str__(self):
         if not self.file:
             return self.title
@@ -25,4 +27,7 @@ class File(Publication):
 
     class Meta(Publication.Meta):
         verbose_name = _('file')
-        verbose_name_plural = _('files')
\ No newline at end of file
+        verbose_name_plural = _('files')
+
+
+track_category_counts(File)
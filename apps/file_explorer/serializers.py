@@ -3,6 +3,7 @@ from django.utils.translation import ugettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 
+from apps.resource.context import get_tenant_context
 from apps.publication.serializers import PublicationSerializer
 from apps.file_explorer.models import File
 
@@ -14,7 +15,7 @@ class FileSerializer(PublicationSerializer):
         fields = super(FileSerializer, self).get_fields()
         file_content_type = ContentType.objects.get_for_model(File)
         fields['categories'].queryset = fields['categories'].queryset.filter(
-            owner=self.context['request'].user.user.owner, model=file_content_type.id)
+            owner=get_tenant_context(self.context['request']).owner_id, model=file_content_type.id)
         return fields
 
     class Meta(PublicationSerializer.Meta):
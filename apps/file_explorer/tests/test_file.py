@@ -5,7 +5,7 @@ from django.test import LiveServerTestCase
 from django.http.request import HttpRequest
 from rest_framework.test import APILiveServerTestCase
 
-from apps.category.tests.routines import test_add_category_routine
+from apps.category.tests.routines import test_add_category_routine, test_filter_category_descendants_routine
 from apps.category.models import Category
 from apps.publication.tests import routines as publication_routines
 from apps.publication.models import Publication
@@ -115,6 +115,9 @@ class FileAPITestCase(APILiveServerTestCase):
     def test_add_category(self):
         test_add_category_routine(self)
 
+    def test_filter_category_descendants(self):
+        test_filter_category_descendants_routine(self)
+
     def test_api_basic_methods(self):
         test_routines.test_api_basic_methods_routine(self)
 
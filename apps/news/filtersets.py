@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 import django_filters
 
-from apps.publication.filtersets import PublicationFilterSet
+from apps.publication.filtersets import CategorizedPublicationFilterSet
 from apps.news.models import News
 
 
-class NewsFilterSet(PublicationFilterSet):
+class NewsFilterSet(CategorizedPublicationFilterSet):
     categories = django_filters.CharFilter(name='categories__name')
 
-    class Meta(PublicationFilterSet.Meta):
+    class Meta(CategorizedPublicationFilterSet.Meta):
         model = News
         fields = ['categories']
\ No newline at end of file
@@ -1,8 +1,8 @@
 import os
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
-from apps.category.models import Category
-from apps.publication.models import Publication
+from apps.category.models import Category, track_category_counts
+from apps.publication.models import Publication, PublicationQuerySet
 from settings.common import MEDIA_ROOT
 
 
@@ -19,9 +19,14 @@ class News(Publication):
     categories = models.ManyToManyField(Category, verbose_name=_('categories'), null=True, blank=True,
                                         related_name='news')
 
+    objects = PublicationQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
     class Meta(Publication.Meta):
         verbose_name = _('news')
-        verbose_name_plural = _('tidings')
\ No newline at end of file
+        verbose_name_plural = _('tidings')
+
+
+track_category_counts(News)
@@ -1,4 +1,6 @@
 from django.contrib.contenttypes.models import ContentType
+from apps.category.serializers import NestedCategorySerializer
+from apps.resource.context import get_tenant_context
 from apps.publication.serializers import PublicationSerializer
 from apps.news.models import News
 
@@ -9,8 +11,9 @@ class NewsSerializer(PublicationSerializer):
         fields = super(NewsSerializer, self).get_fields()
         file_content_type = ContentType.objects.get_for_model(News)
         fields['categories'].queryset = fields['categories'].queryset.filter(
-            owner=self.context['request'].user.user.owner, model=file_content_type.id)
+            owner=get_tenant_context(self.context['request']).owner_id, model=file_content_type.id)
         return fields
 
     class Meta(PublicationSerializer.Meta):
-        model = News
\ No newline at end of file
+        model = News
+        expandable_fields = dict(PublicationSerializer.Meta.expandable_fields, categories=NestedCategorySerializer)
\ No newline at end of file
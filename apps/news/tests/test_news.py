@@ -5,7 +5,8 @@ from django.http.request import HttpRequest
 from django.test import LiveServerTestCase
 from rest_framework.test import APILiveServerTestCase
 
-from apps.category.tests.routines import test_add_category_routine, test_filter_categories_routine
+from apps.category.tests.routines import test_add_category_routine, test_filter_categories_routine, \
+    test_filter_category_descendants_routine
 from apps.category.models import Category
 from apps.publication.tests import routines as publication_routines
 from apps.resource.tests import routines as resource_routines
@@ -85,10 +86,16 @@ class NewsAPITestCase(APILiveServerTestCase):
     def test_unpublish(self):
         publication_routines.test_unpublish_routine(self)
 
+    def test_published_filter(self):
+        publication_routines.test_published_filter_routine(self)
+
     def test_search_fields(self):
         fields = ['title', 'description', 'content']
         test_routines.test_search_fields_routine(self, search_fields=fields)
 
+    def test_full_text_search(self):
+        publication_routines.test_full_text_search_routine(self, content_searched=True)
+
     def test_resource_owner_is_request_user(self):
         resource_routines.test_resource_owner_is_request_user_routine(self)
 
@@ -119,5 +126,36 @@ class NewsAPITestCase(APILiveServerTestCase):
     def test_resource_sites_field(self):
         resource_routines.test_resource_sites_field_routine(self)
 
+    def test_resource_list_queries(self):
+        resource_routines.test_resource_list_queries_routine(self)
+
+    def test_resource_bulk_methods(self):
+        resource_routines.test_resource_bulk_methods_routine(self)
+
+    def test_resource_site_write_queries(self):
+        resource_routines.test_resource_site_write_queries_routine(self)
+
+    def test_resource_cursor_pagination(self):
+        resource_routines.test_resource_cursor_pagination_routine(self)
+
+    def test_resource_list_count_cache(self):
+        resource_routines.test_resource_list_count_cache_routine(self)
+
+    def test_resource_conditional_get(self):
+        resource_routines.test_resource_conditional_get_routine(self)
+
+    def test_resource_response_cache(self):
+        resource_routines.test_resource_response_cache_routine(self)
+
+    def test_resource_sparse_fields(self):
+        resource_routines.test_resource_sparse_fields_routine(self, 'content', expand=('sites', 'categories'))
+
+    def test_resource_autocomplete(self):
+        resource_routines.test_resource_autocomplete_routine(
+            self, 'title', ['Zeta update', 'zeta digest', 'ZETA notes', 'Alpha zeta'])
+
     def test_filter_categories(self):
-        test_filter_categories_routine(self)
\ No newline at end of file
+        test_filter_categories_routine(self)
+
+    def test_filter_category_descendants(self):
+        test_filter_category_descendants_routine(self)
\ No newline at end of file
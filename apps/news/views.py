@@ -8,5 +8,6 @@ class NewsViewSet(PublicationBaseViewSet):
     serializer_class = NewsSerializer
     model = News
     filter_class = NewsFilterSet
+    cache_responses = True
     # TODO find a way to get search fields from parent without having to rename them
     search_fields = ['title', 'description', 'content']
@@ -5,6 +5,7 @@ from django.db import models
 from django.db.utils import IntegrityError
 from django.core.mail import EmailMultiAlternatives
 
+from apps.resource.indexes import register_composite_indexes, register_prefix_indexes
 from apps.resource.models import Resource
 
 
@@ -16,14 +17,15 @@ class Subscription(Resource):
     and put subscription status in a boolean field.
     """
     name = models.CharField(_('name'), max_length=50)
-    email = models.EmailField(_('email'), max_length=200)
+    email = models.EmailField(_('email'), max_length=200, db_index=True)
     token = models.CharField(_('token'), max_length=30, editable=False)
     is_active = models.BooleanField(_('subscription status'), default=True, editable=False)
 
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         self.token = ''.join(random.sample(string.ascii_letters, 15))
-        return super(Subscription, self).save()
+        return super(Subscription, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                              update_fields=update_fields)
 
     def __str__(self):
         return self.email
@@ -109,4 +111,8 @@ class Submission(Resource):
         unique_together = ('subscription', 'newsletter')
         ordering = ['status']
         verbose_name = _('submission')
-        verbose_name_plural = _('submissions')
\ No newline at end of file
+        verbose_name_plural = _('submissions')
+
+
+register_composite_indexes(Submission, ('newsletter', 'status'))
+register_prefix_indexes(Subscription, 'email')
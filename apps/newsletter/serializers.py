@@ -1,12 +1,13 @@
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from apps.resource.relations import HyperlinkedIdentityField
 from apps.resource.serializers import ResourceSerializer
 from apps.newsletter.models import Subscription, Newsletter
 
 
 class SubscriptionSerializer(ResourceSerializer):
-    unsubscribe = serializers.HyperlinkedIdentityField(label=_('unsubscribe'), view_name='subscription-unsubscribe')
+    unsubscribe = HyperlinkedIdentityField(label=_('unsubscribe'), view_name='subscription-unsubscribe')
     submissions = serializers.RelatedField(label=_('submissions'), many=True, source='submissions')
 
     class Meta(ResourceSerializer.Meta):
@@ -15,8 +16,8 @@ class SubscriptionSerializer(ResourceSerializer):
 
 
 class NewsletterSerializer(ResourceSerializer):
-    send_newsletter = serializers.HyperlinkedIdentityField(label=_('send newsletter'),
-                                                           view_name='newsletter-send-newsletter')
+    send_newsletter = HyperlinkedIdentityField(label=_('send newsletter'),
+                                               view_name='newsletter-send-newsletter')
     submissions = serializers.RelatedField(label=_('submissions'), many=True, source='submissions')
 
     class Meta(ResourceSerializer.Meta):
@@ -9,6 +9,7 @@ from rest_framework import status
 from apps.resource.tests import routines as resource_routines
 from apps.resource.models import User
 import test_routines
+from test_routines import request_within_budget
 import test_fixtures
 from apps.newsletter.models import Newsletter, Subscription
 
@@ -133,7 +134,7 @@ class NewsletterAPITestCase(APILiveServerTestCase):
         response2 = self.client.post(reverse('subscription-list'),
                                      data={'name': 'idan', 'email': 'idan@idan.com.br'})
         self.assertEqual(status.HTTP_201_CREATED, response2.status_code)
-        response3 = self.client.post(self.first_object_response.data['send_newsletter'])
+        response3 = request_within_budget(self, 'post', self.first_object_response.data['send_newsletter'])
         self.assertEqual(status.HTTP_200_OK, response3.status_code)
         data = {
             'new': 2,
@@ -142,7 +143,7 @@ class NewsletterAPITestCase(APILiveServerTestCase):
             'failed': 0,
         }
         self.assertEqual(data, response3.data['submissions'])
-        response4 = self.client.post(self.first_object_response.data['send_newsletter'])
+        response4 = request_within_budget(self, 'post', self.first_object_response.data['send_newsletter'])
         data = {
             'new': 0,
             'successful': 2,
@@ -162,7 +163,7 @@ class NewsletterAPITestCase(APILiveServerTestCase):
         response3 = self.client.post(reverse('subscription-list'),
                                      data={'name': 'iran', 'email': 'iran@iran.com.br'})
         self.assertEqual(status.HTTP_201_CREATED, response3.status_code)
-        response4 = self.client.post(self.first_object_response.data['send_newsletter'])
+        response4 = request_within_budget(self, 'post', self.first_object_response.data['send_newsletter'])
         self.assertEqual(status.HTTP_200_OK, response4.status_code)
         data = dict(new=3, successful=3, resubmissions=0, failed=0)
         self.assertEqual(status.HTTP_200_OK, response4.status_code)
@@ -172,7 +173,7 @@ class NewsletterAPITestCase(APILiveServerTestCase):
         response1 = self.client.post(reverse('subscription-list'),
                                      data={'name': 'ivan', 'email': 'ivan@ivan.com.br'})
         response2 = self.client.get(self.url)
-        response3 = self.client.post(self.first_object_response.data['send_newsletter'])
+        response3 = request_within_budget(self, 'post', self.first_object_response.data['send_newsletter'])
         response4 = self.client.get(self.url)
         self.assertEqual(status.HTTP_201_CREATED, response1.status_code)
         self.assertEqual([], response2.data['results'][0]['submissions'], response2.data)
@@ -158,3 +158,18 @@ class SubscriptionAPITestCase(APILiveServerTestCase):
         self.assertEqual(response.data['url'], self.first_object_response.data['url'])
         response = self.client.get(self.first_object_response.data['url'])
         self.assertTrue(response.data['is_active'])
+
+    def test_bulk_create_reactivates_subscriptions(self):
+        subscription = Subscription.objects.get(id=self.first_object_response.data['url'].split('/')[-2])
+        self.client.post(self.first_object_response.data['unsubscribe'], {'token': subscription.token})
+        data = [{'name': 'Idan', 'email': 'idan@gmail.com'}, self.altered_data, self.altered_data]
+        response = self.client.post(self.url, data)
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+        self.assertEqual(self.first_object_response.data['url'], response.data[0]['url'])
+        self.assertTrue(response.data[0]['is_active'])
+        self.assertEqual(response.data[1]['url'], response.data[2]['url'])
+        self.assertEqual(2, Subscription.objects.filter(owner=self.owner).count())
+
+    def test_resource_autocomplete(self):
+        resource_routines.test_resource_autocomplete_routine(
+            self, 'email', ['zeta.update@gmail.com', 'Zeta.digest@gmail.com', 'alpha.zeta@gmail.com'])
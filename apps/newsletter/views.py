@@ -1,21 +1,26 @@
 from django.utils.translation import ugettext_lazy as _
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework import status
 
-from apps.resource.views import ResourceViewSet
+from apps.resource.context import get_tenant_context
+from apps.resource.views import AutocompleteMixin, ResourceViewSet
 from apps.newsletter.serializers import SubscriptionSerializer, NewsletterSerializer
 from apps.newsletter.models import Subscription, Newsletter
 from apps.newsletter.filtersets import NewsletterFilterSet
 
 
-class SubscriptionViewSet(ResourceViewSet):
+class SubscriptionViewSet(AutocompleteMixin, ResourceViewSet):
     serializer_class = SubscriptionSerializer
     model = Subscription
+    autocomplete_field = 'email'
 
     def create(self, request, *args, **kwargs):
+        if isinstance(request.DATA, list):
+            return super(SubscriptionViewSet, self).create(request, *args, **kwargs)
         try:
             subscription = Subscription.objects.get(email=request.DATA['email'],
-                                                    owner=request.user.user.owner)
+                                                    owner=get_tenant_context(request).owner_id)
         except Subscription.DoesNotExist:
             return super(SubscriptionViewSet, self).create(request, *args, **kwargs)
         else:
@@ -24,6 +29,36 @@ class SubscriptionViewSet(ResourceViewSet):
             serialized_data = SubscriptionSerializer(subscription, context={'request': request})
             return Response(data=serialized_data.data, status=201)
 
+    def bulk_create(self, request, *args, **kwargs):
+        """Creates the subscriptions of a list, all of them or none.
+
+        As when subscribing one email, the subscriptions of emails already subscribed are reactivated. Emails repeated
+        in the list are subscribed once.
+        """
+        self.query_budget_items = len(request.DATA)
+        serializer = self.get_serializer(data=request.DATA, files=request.FILES, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        emails = [obj.email for obj in serializer.object]
+        subscriptions = dict((subscription.email, subscription) for subscription in Subscription.objects.filter(
+            owner=get_tenant_context(request).owner_id, email__in=emails))
+        created = []
+        for index, obj in enumerate(serializer.object):
+            subscription = subscriptions.get(obj.email)
+            if subscription is None:
+                self.pre_save(obj)
+                serializer.save_object(obj, force_insert=True)
+                subscriptions[obj.email] = obj
+                created.append(obj)
+            else:
+                if subscription not in created:
+                    subscription.is_active = True
+                    subscription.save()
+                serializer.object[index] = subscription
+        self.object_list = created
+        self.post_bulk_save(self.object_list, created=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action()
     def unsubscribe(self, request, *args, **kwargs):
         """Verify token and subscriber to deactivate a subscritpion.
@@ -47,12 +82,15 @@ class NewsletterViewSet(ResourceViewSet):
     serializer_class = NewsletterSerializer
     model = Newsletter
     filter_class = NewsletterFilterSet
+    query_budget = dict(ResourceViewSet.query_budget, send_newsletter=(13, 8))
 
     @action()
     def send_newsletter(self, request, *args, **kwargs):
         """Send the newsletter calling the model function."""
         newsletter = self.get_object()
-        status = newsletter.send_newsletter(owner=request.user.user.owner)
+        status = newsletter.send_newsletter(owner=get_tenant_context(request).owner_id)
+        # Each subscription gets a submission, which is sent once
+        self.query_budget_items = status['successful'] + status['failed']
         data = {
             'submissions': status,
         }
@@ -1,11 +1,44 @@
 # -*- coding: utf-8 -*-
 import django_filters
+from django.utils.translation import ugettext_lazy as _
 
-from apps.publication.models import Publication
+from apps.category.filtersets import CategoryFilter
+from apps.publication.models import Publication, CustomHTML
+
+
+class PublishedFilter(django_filters.ChoiceFilter):
+    """Filters the publications published now, with "true", or the ones not published now, with "false"."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', (('', '---------'), ('true', _('Yes')), ('false', _('No'))))
+        super(PublishedFilter, self).__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value == 'true':
+            return qs.published()
+        if value == 'false':
+            return qs.unpublished()
+        return qs
 
 
 class PublicationFilterSet(django_filters.FilterSet):
+    published = PublishedFilter(label=_('publication status'))
 
     class Meta:
         model = Publication
-        fields = []
\ No newline at end of file
+        fields = []
+
+
+class CustomHTMLFilterSet(PublicationFilterSet):
+
+    class Meta(PublicationFilterSet.Meta):
+        model = CustomHTML
+
+
+class CategorizedPublicationFilterSet(PublicationFilterSet):
+    """Filters the publications of a category, by its id, and of its descendants with "include_descendants=true"."""
+    category = CategoryFilter()
+
+    def __init__(self, *args, **kwargs):
+        super(CategorizedPublicationFilterSet, self).__init__(*args, **kwargs)
+        self.filters['category'].include_descendants = self.data.get('include_descendants') in ('true', '1')
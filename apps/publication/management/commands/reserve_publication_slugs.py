@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from django.apps import apps
+from django.core.management.base import NoArgsCommand
+
+from apps.publication.models import Publication
+
+
+class Command(NoArgsCommand):
+    help = 'Reserves the slugs of the publications saved before slugs were reserved. Publications sharing a slug ' \
+           'with an older publication of the same model and owner get the next free one.'
+
+    def handle_noargs(self, **options):
+        models = [model for model in apps.get_models() if issubclass(model, Publication)]
+        # Publications are reserved as their most derived model, whose rows are also rows of its parents
+        models.sort(key=lambda model: len(model._meta.get_parent_list()), reverse=True)
+        reserved = renamed = 0
+        for model in models:
+            publications = model.objects.filter(slug_reservation__isnull=True).exclude(slug='').order_by('id')
+            for publication in publications:
+                slug = publication.slug
+                publication.reserve_slug()
+                reserved += 1
+                renamed += publication.slug != slug
+        self.stdout.write('Reserved {0} slugs, {1} of them renamed.'.format(reserved, renamed))
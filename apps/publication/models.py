@@ -1,9 +1,64 @@
+import re
+
 from django.utils.translation import ugettext_lazy as _
-from django.db import models
-from django.utils.text import slugify
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, connections, transaction, IntegrityError
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.resource.cache import atomic_write
+from apps.resource.indexes import register_composite_indexes, register_prefix_indexes
+from apps.resource.models import Resource, AuthUser
+from apps.resource.search import register_search_index
 
-from apps.resource.models import Resource
+
+# Number of slugs tried when concurrent saves reserve the same slug
+SLUG_ATTEMPTS = 10
+
+
+class PublicationQuerySet(models.QuerySet):
+    """Queryset of publications, selecting them by their publication dates in the database.
+
+    A publication is published from its start date, until its end date if it has one. Querysets selecting the
+    publications by the current date are flagged as time_dependent, since their SQL changes on each request.
+    """
+    time_dependent = False
+
+    def _clone(self, *args, **kwargs):
+        clone = super(PublicationQuerySet, self)._clone(*args, **kwargs)
+        clone.time_dependent = self.time_dependent
+        return clone
+
+    def published(self, at=None):
+        """Returns the publications published at the date, or now."""
+        at_or_now = at or timezone.now()
+        queryset = self.filter(Q(publication_end_date__isnull=True) | Q(publication_end_date__gte=at_or_now),
+                               publication_start_date__lte=at_or_now)
+        queryset.time_dependent = queryset.time_dependent or at is None
+        return queryset
+
+    def unpublished(self, at=None):
+        """Returns the publications not published at the date, or now."""
+        at_or_now = at or timezone.now()
+        queryset = self.filter(Q(publication_start_date__gt=at_or_now) | Q(publication_end_date__lt=at_or_now))
+        queryset.time_dependent = queryset.time_dependent or at is None
+        return queryset
+
+    def with_published_state(self, at=None):
+        """Selects whether each publication is published at the date, or now, as its "published_state"."""
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        start_field = self.model._meta.get_field('publication_start_date')
+        end_field = self.model._meta.get_field('publication_end_date')
+        table = quote_name(start_field.model._meta.db_table)
+        start = '{0}.{1}'.format(table, quote_name(start_field.column))
+        end = '{0}.{1}'.format(table, quote_name(end_field.column))
+        at = connection.ops.value_to_db_datetime(at or timezone.now())
+        return self.extra(
+            select={'published_state': 'CASE WHEN {0} <= %s AND ({1} IS NULL OR {1} >= %s) THEN 1 ELSE 0 END'.format(
+                start, end)},
+            select_params=(at, at))
 
 
 class Publication(Resource):
@@ -19,6 +74,8 @@ class Publication(Resource):
     publication_start_date = models.DateTimeField(_('publication start date'), blank=True, default=timezone.now())
     publication_end_date = models.DateTimeField(_('publication end date'), blank=True, null=True)
 
+    objects = PublicationQuerySet.as_manager()
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         try:
@@ -34,11 +91,48 @@ class Publication(Resource):
             pass
         except ValueError:
             pass
-        super(Publication, self).save()
+        adding = self._state.adding
+        if not adding and not self.has_changed('slug'):
+            return super(Publication, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                                  update_fields=update_fields)
+        with atomic_write(using=using):
+            super(Publication, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                          update_fields=update_fields)
+            self.reserve_slug(adding)
 
     def __str__(self):
         return self.title
 
+    def reserve_slug(self, adding=False):
+        """Reserves the slug of the publication among the publications of its model and owner.
+
+        If another publication reserved the slug first, the next free one is reserved and saved instead. Publications
+        just added have no reservation to update.
+        """
+        if not self.slug:
+            return
+        slug = self.slug
+        # Numbers ending the slug of the title are part of it, the ones added after it are suffixes
+        base_slug = slugify(u'%s' % self.title)
+        if not base_slug or not slug.startswith(base_slug):
+            base_slug = slug
+        content_type = ContentType.objects.get_for_model(self)
+        for attempt in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    reservations = PublicationSlug.objects.filter(publication=self.pk)
+                    if adding or not reservations.update(owner=self.owner_id, slug=self.slug):
+                        PublicationSlug.objects.create(publication_id=self.pk, owner_id=self.owner_id,
+                                                       content_type=content_type, slug=self.slug)
+                break
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS - 1:
+                    raise
+                self.slug = find_available_slug(self, base_slug)
+        if self.slug != slug:
+            Publication.objects.filter(pk=self.pk).update(slug=self.slug)
+            self._loaded_values['slug'] = self.slug
+
     def publish(self):
         """Publishes a publication.
 
@@ -76,25 +170,63 @@ class Publication(Resource):
         else:
             return True
 
+    def get_last_modified(self):
+        """Returns the date of the last change of the publication, which includes passed publication dates.
+
+        Publications are published and unpublished by their dates, without any change being saved.
+        """
+        now = timezone.now()
+        dates = [self.publication_start_date, self.publication_end_date]
+        return max([self.last_modification_date] + [date for date in dates if date and date <= now])
+
     class Meta(Resource.Meta):
         verbose_name = _('publication')
         verbose_name_plural = _('publications')
 
 
 class CustomHTML(Publication):
+    # Managers of concrete parents are not inherited
+    objects = PublicationQuerySet.as_manager()
+
     class Meta(Publication.Meta):
         verbose_name = _('custom HTML')
         verbose_name_plural = _('custom HTMLs')
 
 
-def find_available_slug(model, instance, slug, original_slug, slug_number=2):
-    #Adds scores with an incrementing number to the slug until an available one is found.
-    try:
-        sender_node = model.objects.get(slug=slug)
-    except model.DoesNotExist:
-        instance.slug = slug
-    else:
-        slug = slugify(u'%s-%d' % (original_slug, slug_number))
-        slug_number += 1
-        find_available_slug(model, instance, slug, original_slug, slug_number=slug_number)
-    return
\ No newline at end of file
+register_composite_indexes(Publication, ('publication_start_date', 'publication_end_date'))
+register_prefix_indexes(Publication, 'title')
+# Searches of publications rank titles first, then descriptions, then contents
+register_search_index(Publication, 'title', 'description', 'content')
+
+
+class PublicationSlug(models.Model):
+    """Slug reserved by a publication, unique among the publications of the same model and owner.
+
+    The slugs of every model are in the table of Publication and their owners in the table of Resource, so they are
+    reserved in this table, where one unique index covers both.
+    """
+    publication = models.OneToOneField(Publication, related_name='slug_reservation')
+    owner = models.ForeignKey(AuthUser)
+    content_type = models.ForeignKey(ContentType)
+    slug = models.SlugField(max_length=150, db_index=False)
+
+    class Meta:
+        unique_together = ('owner', 'content_type', 'slug')
+
+
+def find_available_slug(instance, slug):
+    """Returns the slug, or the slug with the next free number suffix, among the publications of the model and
+    owner of the instance.
+
+    The reserved slugs starting with the slug are read in one query, and the biggest suffix is incremented.
+    """
+    reservations = PublicationSlug.objects.filter(
+        owner=instance.owner_id, content_type=ContentType.objects.get_for_model(instance), slug__startswith=slug)
+    if instance.pk:
+        reservations = reservations.exclude(publication=instance.pk)
+    reserved = set(reservations.values_list('slug', flat=True))
+    if slug not in reserved:
+        return slug
+    pattern = re.compile(r'^{0}-(\d+)$'.format(re.escape(slug)))
+    numbers = [int(match.group(1)) for match in map(pattern.match, reserved) if match]
+    return u'{0}-{1}'.format(slug, max(numbers + [1]) + 1)
\ No newline at end of file
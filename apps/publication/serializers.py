@@ -1,17 +1,29 @@
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from apps.resource.relations import HyperlinkedIdentityField
 from apps.resource.serializers import ResourceSerializer
 from apps.publication.models import Publication, CustomHTML
 
 
+class PublishedStateField(serializers.BooleanField):
+    """Publication status, read from the state selected by PublicationQuerySet.with_published_state if there is one."""
+
+    def field_to_native(self, obj, field_name):
+        published_state = getattr(obj, 'published_state', None)
+        if published_state is None:
+            return super(PublishedStateField, self).field_to_native(obj, field_name)
+        return bool(published_state)
+
+
 class PublicationSerializer(ResourceSerializer):
-    is_published = serializers.BooleanField(label=_('publication status'), source='is_published', read_only=True)
-    publish = serializers.HyperlinkedIdentityField(label=_('publish'), view_name='publication-publish')
-    unpublish = serializers.HyperlinkedIdentityField(label=_('unpublish'), view_name='publication-unpublish')
+    is_published = PublishedStateField(label=_('publication status'), source='is_published', read_only=True)
+    publish = HyperlinkedIdentityField(label=_('publish'), view_name='publication-publish')
+    unpublish = HyperlinkedIdentityField(label=_('unpublish'), view_name='publication-unpublish')
 
     class Meta(ResourceSerializer.Meta):
         model = Publication
+        field_dependencies = {'is_published': ('publication_start_date', 'publication_end_date')}
 
 
 class CustomHTMLSerializer(PublicationSerializer):
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
+import time
+from datetime import timedelta
+
+from django.utils import timezone
 from django.utils.text import slugify
 from rest_framework import status
 
 from apps.resource.tests.routines import test_resource_serializer_hyperlinked_fields_routine
+from test_routines import request_within_budget
 
 
 def test_slug_is_slugified_title_routine(test_case, slug_repeat_number='-2'):
@@ -29,7 +34,7 @@ def test_is_published_default_true_routine(test_case):
 
 def get_action_response(test_case, action_name, status_code=status.HTTP_200_OK):
     action_url = test_case.first_object_response.data[action_name]
-    response = test_case.client.post(action_url)
+    response = request_within_budget(test_case, 'post', action_url)
     test_case.assertEqual(response.status_code, status_code)
     return response
 
@@ -48,3 +53,65 @@ def test_publication_serializer_hyperlinked_fields_routine(test_case, fields):
     test_resource_serializer_hyperlinked_fields_routine(test_case, fields)
 
 
+def test_published_filter_routine(test_case):
+    unpublished_url = test_case.first_object_response.data['url']
+    get_action_response(test_case, 'unpublish')
+    response = test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    published_url = response.data['url']
+
+    response = test_case.client.get(test_case.url, {'published': 'true'})
+    urls = [item['url'] for item in response.data['results']]
+    test_case.assertIn(published_url, urls)
+    test_case.assertNotIn(unpublished_url, urls)
+    test_case.assertTrue(all(item['is_published'] for item in response.data['results']))
+
+    response = test_case.client.get(test_case.url, {'published': 'false'})
+    test_case.assertEqual([unpublished_url], [item['url'] for item in response.data['results']])
+    test_case.assertFalse(response.data['results'][0]['is_published'])
+    test_case.assertFalse(test_case.client.get(unpublished_url).data['is_published'])
+
+    response = test_case.client.get(test_case.url)
+    test_case.assertEqual(2, len([item for item in response.data['results'] if item['url'] in (published_url,
+                                                                                               unpublished_url)]))
+
+    # Cached responses expire when a publication is published by its date
+    start_date = timezone.now() + timedelta(seconds=2)
+    response = test_case.client.post(test_case.url, dict(test_case.data, publication_start_date=start_date.isoformat()))
+    test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    scheduled_url = response.data['url']
+    response = test_case.client.get(test_case.url, {'published': 'true'})
+    test_case.assertNotIn(scheduled_url, [item['url'] for item in response.data['results']])
+    list_etag = test_case.client.get(test_case.url)['ETag']
+    time.sleep(max((start_date - timezone.now()).total_seconds(), 0) + 0.1)
+    response = test_case.client.get(test_case.url, {'published': 'true'})
+    test_case.assertIn(scheduled_url, [item['url'] for item in response.data['results']])
+    # Lists held by clients change too, though neither their count nor their modification dates did
+    response = test_case.client.get(test_case.url, HTTP_IF_NONE_MATCH=list_etag)
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code)
+    test_case.assertTrue([item for item in response.data['results'] if item['url'] == scheduled_url][0]['is_published'])
+
+
+def test_full_text_search_routine(test_case, content_searched=False):
+    title_url = test_case.client.post(test_case.url, dict(test_case.data, title=u'Notícias da semana')).data['url']
+    description_url = test_case.client.post(test_case.url, dict(
+        test_case.data, title='Other', description=u'Semana com notícias')).data['url']
+    content_url = test_case.client.post(test_case.url, dict(
+        test_case.data, title='Another', content=u'<p>Notícias da semana</p>')).data['url']
+
+    # Titles rank before descriptions, accents are ignored and terms are matched in any order
+    response = test_case.client.get(test_case.url, {'search': 'semana noticias'})
+    urls = [item['url'] for item in response.data['results']]
+    expected = [title_url, description_url] + ([content_url] if content_searched else [])
+    test_case.assertEqual(expected, urls)
+
+    response = test_case.client.get(test_case.url, {'search': '"da semana"'})
+    expected = [title_url] + ([content_url] if content_searched else [])
+    test_case.assertEqual(expected, [item['url'] for item in response.data['results']])
+
+    # The index follows the changes to the publications
+    test_case.client.patch(title_url, {'title': 'Nothing new'})
+    test_case.client.delete(description_url)
+    response = test_case.client.get(test_case.url, {'search': 'semana'})
+    test_case.assertEqual([content_url] if content_searched else [],
+                          [item['url'] for item in response.data['results']])
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.utils.six import StringIO
 from django.test import LiveServerTestCase
 from django.utils import timezone
 from django.http import HttpRequest
@@ -7,10 +10,12 @@ from rest_framework.test import APILiveServerTestCase
 from rest_framework import status
 from apps.publication.tests import routines as publication_routines
 from apps.resource.tests import routines as resource_routines
+from apps.resource.cache import get_list_count
 from apps.resource.models import AuthUser, User
+from apps.resource.pagination import count_queryset, get_queryset_fingerprint
 import test_routines
 import test_fixtures
-from apps.publication.models import Publication, CustomHTML, find_available_slug
+from apps.publication.models import Publication, CustomHTML, PublicationSlug, find_available_slug
 from apps.publication.views import PublicationBaseViewSet
 
 
@@ -48,6 +53,30 @@ class PublicationTestCase(LiveServerTestCase):
         self.assertFalse(pub.is_published())
         self.assertTrue(pub.publish())
 
+    def test_model_get_last_modified_method(self):
+        pub = self.publication
+        tomorrow = timezone.now() + timezone.timedelta(1)
+        pub.publication_start_date = tomorrow
+        pub.save()
+        self.assertEqual(pub.last_modification_date, pub.get_last_modified())
+        # The publication is published by its date, without being saved
+        pub.publication_start_date = timezone.now()
+        self.assertEqual(pub.publication_start_date, pub.get_last_modified())
+        pub.publication_end_date = timezone.now()
+        self.assertEqual(pub.publication_end_date, pub.get_last_modified())
+
+    def test_queryset_counts_by_current_time_are_not_cached(self):
+        at = timezone.now()
+        queryset = Publication.objects.published(at=at).filter(owner=self.user)
+        self.assertFalse(queryset.time_dependent)
+        self.assertEqual((1, True), count_queryset(queryset, self.user.pk))
+        self.assertEqual((1, True), get_list_count(self.user.pk, get_queryset_fingerprint(queryset)))
+        for queryset in (Publication.objects.published(), Publication.objects.unpublished()):
+            queryset = queryset.filter(owner=self.user)
+            self.assertTrue(queryset.time_dependent)
+            count_queryset(queryset, self.user.pk)
+            self.assertIsNone(get_list_count(self.user.pk, get_queryset_fingerprint(queryset)))
+
     def test_model_save_method(self):
         pub = self.publication
         pub.publication_start_date = timezone.datetime.now()
@@ -61,14 +90,65 @@ class PublicationTestCase(LiveServerTestCase):
     def test_find_available_slug_method(self):
         slug = 'test'
         pub = self.publication
-        find_available_slug(Publication, pub, slug, slug)
-        self.assertEqual(slug, pub.slug)
-        pub.save()
-        find_available_slug(Publication, pub, slug, slug)
-        self.assertEqual(slug + '-2', pub.slug)
+        self.assertEqual(slug, find_available_slug(pub, slug))
+        pub.slug = slug
         pub.save()
-        find_available_slug(Publication, pub, slug, slug)
-        self.assertEqual(slug, pub.slug)
+        self.assertEqual(slug, find_available_slug(pub, slug))
+        other = Publication(owner=self.user, author=self.user, title='Other pub', content='Content')
+        self.assertEqual(slug + '-2', find_available_slug(other, slug))
+        other.slug = slug + '-7'
+        other.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(slug + '-8', find_available_slug(Publication(owner=self.user), slug))
+        self.assertEqual('test-7-2', find_available_slug(Publication(owner=self.user), 'test-7'))
+        owner = AuthUser.objects.create_user(username='owner', password='123')
+        self.assertEqual(slug, find_available_slug(Publication(owner=owner), slug))
+        self.assertEqual(slug, find_available_slug(CustomHTML(owner=self.user), slug))
+
+    def test_concurrent_slugs_are_unique(self):
+        # Each publication finds its slug before any of them is saved, as concurrent requests would
+        publications = []
+        for index in range(20):
+            publication = CustomHTML(owner=self.user, author=self.user, title='Weekly update', content='Content')
+            publication.slug = find_available_slug(publication, 'weekly-update')
+            publications.append(publication)
+        for publication in publications:
+            publication.save()
+        slugs = list(CustomHTML.objects.values_list('slug', flat=True))
+        self.assertEqual(20, len(set(slugs)))
+        self.assertIn('weekly-update', slugs)
+        self.assertEqual(sorted(slugs), sorted(PublicationSlug.objects.values_list('slug', flat=True)))
+        self.assertEqual([publication.slug for publication in publications], [
+            CustomHTML.objects.get(pk=publication.pk).slug for publication in publications])
+
+    def test_concurrent_slugs_keep_title_numbers(self):
+        publications = [CustomHTML(owner=self.user, author=self.user, title='Top 10', content='Content')
+                        for index in range(3)]
+        for publication in publications:
+            publication.slug = find_available_slug(publication, 'top-10')
+        for publication in publications:
+            publication.save()
+        self.assertEqual(['top-10', 'top-10-2', 'top-10-3'],
+                         sorted(CustomHTML.objects.values_list('slug', flat=True)))
+
+    def test_reserve_publication_slugs_command(self):
+        publication = CustomHTML.objects.create(owner=self.user, author=self.user, title='Test', content='Content',
+                                                slug='test')
+        for index in range(2):
+            CustomHTML.objects.filter(pk=publication.pk).update(slug='test')
+            Publication.objects.filter(pk=self.publication.pk).update(slug='test')
+            PublicationSlug.objects.all().delete()
+            call_command('reserve_publication_slugs', stdout=StringIO())
+            self.assertEqual('test', Publication.objects.get(pk=self.publication.pk).slug)
+            self.assertEqual('test', CustomHTML.objects.get(pk=publication.pk).slug)
+        duplicate = CustomHTML.objects.create(owner=self.user, author=self.user, title='Test', content='Content',
+                                              slug='test')
+        PublicationSlug.objects.filter(publication=duplicate).delete()
+        CustomHTML.objects.filter(pk=duplicate.pk).update(slug='test')
+        call_command('reserve_publication_slugs', stdout=StringIO())
+        self.assertEqual('test-2', CustomHTML.objects.get(pk=duplicate.pk).slug)
+        self.assertEqual(ContentType.objects.get_for_model(CustomHTML),
+                         PublicationSlug.objects.get(publication=publication).content_type)
 
     def test_viewset_pre_save_method(self):
         request = HttpRequest()
@@ -86,13 +166,14 @@ class PublicationTestCase(LiveServerTestCase):
         pub_view_set.pre_save(self.publication)
         self.assertFalse(self.publication.slug)
 
-        request.DATA['title'] = 'test pub test'
-        pub_view_set.request = request
-        pub_view_set.pre_save(pub_obj)
+        # The serializer restores the request data to the object before pre_save
+        pub_obj.title = 'test pub test'
+        # Only the sites of the object are read, the title is compared to the loaded one
+        with self.assertNumQueries(1):
+            pub_view_set.pre_save(pub_obj)
         self.assertEqual('test-pub-test', pub_obj.slug)
 
-        request.DATA['title'] = 'another pub'
-        pub_view_set.request = request
+        pub_obj.title = 'another pub'
         pub_view_set.pre_save(pub_obj)
         self.assertEqual('another-pub', pub_obj.slug)
 
@@ -192,10 +273,16 @@ class CustomHTMLAPITestCase(APILiveServerTestCase):
     def test_unpublish(self):
         publication_routines.test_unpublish_routine(self)
 
+    def test_published_filter(self):
+        publication_routines.test_published_filter_routine(self)
+
     def test_search_fields(self):
         search_fields = ['title', 'description']
         test_routines.test_search_fields_routine(self, search_fields=search_fields)
 
+    def test_full_text_search(self):
+        publication_routines.test_full_text_search_routine(self)
+
     def test_owner_is_request_user(self):
         resource_routines.test_resource_owner_is_request_user_routine(self)
 
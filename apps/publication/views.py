@@ -1,50 +1,81 @@
+import math
+
+from django.db.models import Max, Min
 from django.utils.text import slugify
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
-from django.core.exceptions import ObjectDoesNotExist
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, permissions
 
-from apps.resource.views import ResourceViewSet
+from apps.resource.context import get_tenant_context
+from apps.resource.views import AutocompleteMixin, ResourceViewSet
 from apps.publication.serializers import PublicationSerializer, CustomHTMLSerializer
 from apps.publication.models import find_available_slug, Publication, CustomHTML
-from apps.publication.filtersets import PublicationFilterSet
+from apps.publication.filtersets import PublicationFilterSet, CustomHTMLFilterSet
 
 
-class PublicationBaseViewSet(ResourceViewSet):
+class PublicationBaseViewSet(AutocompleteMixin, ResourceViewSet):
     """
 
-    The fields title and description are defined as fields that can be searched.
+    The fields title and description are defined as fields that can be searched, and titles are autocompleted.
     """
     model = Publication
     serializer_class = PublicationSerializer
     filter_class = PublicationFilterSet
     search_fields = ('title', 'description')
+    autocomplete_field = 'title'
+    cursor_ordering = ('-publication_start_date', '-id')
+    # Saves reserve the slug in a savepoint, and lists read the passed publication dates and the next ones
+    query_budget = dict(ResourceViewSet.query_budget, list=15, create=25, update=25, partial_update=14, destroy=17,
+                        publish=10, unpublish=11, bulk_create=(10, 14), bulk_update=(16, 6))
+
+    def get_queryset(self):
+        """Returns the queryset, selecting whether each publication is published on reads."""
+        queryset = super(PublicationBaseViewSet, self).get_queryset()
+        if self.request.method in permissions.SAFE_METHODS:
+            queryset = queryset.with_published_state()
+        return queryset
+
+    def get_list_last_modified(self, queryset):
+        """Returns the date of the last change of the publications, which includes passed publication dates.
+
+        As for Publication.get_last_modified, publications are published and unpublished by their dates without any
+        change being saved.
+        """
+        now = timezone.now()
+        dates = [super(PublicationBaseViewSet, self).get_list_last_modified(queryset)]
+        for name in ('publication_start_date', 'publication_end_date'):
+            dates.append(queryset.order_by().filter(**{name + '__lte': now}).aggregate(date=Max(name))['date'])
+        dates = [date for date in dates if date is not None]
+        return max(dates) if dates else None
+
+    def get_response_cache_timeout(self):
+        """Returns the cache timeout of the responses, capped to the next publication date of the owner.
+
+        Publications are published and unpublished by their dates, which changes their state and the ones listed by
+        the published filter without any change being saved.
+        """
+        timeout = super(PublicationBaseViewSet, self).get_response_cache_timeout()
+        now = timezone.now()
+        queryset = self.model.objects.filter(owner=get_tenant_context(self.request).owner_id)
+        for name in ('publication_start_date', 'publication_end_date'):
+            date = queryset.filter(**{name + '__gt': now}).aggregate(date=Min(name))['date']
+            if date is not None:
+                timeout = min(timeout, int(math.ceil((date - now).total_seconds())))
+        return timeout
 
     def pre_save(self, obj):
         """Defines all actions needed before saving the object.
 
         Calls the actions from ResourceViewSet.
-        Finds an available slug.
+        Finds an available slug, if the title changed.
         Defines a publication start date, if it does not exist.
         """
         super(PublicationBaseViewSet, self).pre_save(obj)
-        try:
-            last_title = Publication.objects.get(id=obj.id).title
-        except ObjectDoesNotExist:
+        if obj.has_changed('title'):
             # Creates a slug for the publication based on the title
-            slug = slugify(u'%s' % obj.title)
-            find_available_slug(self.model, obj, slug, slug)
-        else:
-            try:
-                title = self.request.DATA['title']
-                if title != last_title:
-                    # Creates a slug for the publication based on the title
-                    slug = slugify(u'%s' % title)
-                    find_available_slug(self.model, obj, slug, slug)
-            except KeyError:
-                pass
+            obj.slug = find_available_slug(obj, slugify(u'%s' % obj.title))
         # Creates a publication_start_date for the publication in case it does not exists
         if not obj.publication_start_date:
             obj.publication_start_date = timezone.now()
@@ -82,8 +113,15 @@ class PublicationViewSet(PublicationBaseViewSet):
     def destroy(self, request, *args, **kwargs):
         return Response(data={'detail': _('Method \'DELETE\' not allowed.')}, status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_update(self, request, *args, **kwargs):
+        return Response(data={'detail': _('Method \'PATCH\' not allowed.')}, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        return Response(data={'detail': _('Method \'DELETE\' not allowed.')}, status=status.HTTP_400_BAD_REQUEST)
+
 
 class CustomHTMLViewSet(PublicationBaseViewSet):
     model = CustomHTML
     serializer_class = CustomHTMLSerializer
-    filter_class = None
\ No newline at end of file
+    filter_class = CustomHTMLFilterSet
+    cache_responses = True
\ No newline at end of file
@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
 from rest_framework import filters, permissions
+from apps.resource.context import get_tenant_context
 from apps.resource.models import AuthorRestriction
+from apps.resource.search import can_search, get_search_terms, search_queryset
 
 
 custom_permissions_map = {
@@ -24,10 +24,10 @@ class CustomDjangoModelPermissions(permissions.DjangoModelPermissions):
 class SiteDomainFilterBackend(filters.BaseFilterBackend):
 
     def filter_queryset(self, request, queryset, view):
-        domain = request.META.get('HTTP_HOST')
-        if not domain:
-            domain = request.META.get('SERVER_NAME')
-        return queryset.filter(sites__domain=domain)
+        site_id = get_tenant_context(request).site_id
+        if site_id is None:
+            return queryset.none()
+        return queryset.filter(sites=site_id)
 
 
 class AuthorRestrictionBackend(filters.BaseFilterBackend):
@@ -52,23 +52,48 @@ class AuthorRestrictionBackend(filters.BaseFilterBackend):
             permission = custom_permissions_map[request.method][0] % kwargs
         except KeyError:
             permission = None
-        if permission and request.user.has_perm(permission):
-            app_label, codename = permission.split('.')
-            try:
-                creator_restriction = AuthorRestriction.objects.filter(
-                    Q(permission__content_type__app_label=app_label), Q(permission__codename=codename),
-                    Q(user=request.user) | Q(group__in=request.user.groups.all()))[0]
-            except ObjectDoesNotExist:
-                queryset = queryset.filter(author=request.user)
-            except IndexError:
-                queryset = queryset.filter(author=request.user)
-            else:
-                queryset = queryset.filter(author__in=creator_restriction.filter_values.split(','))
-            return queryset
+        if permission and get_tenant_context(request).has_perm(permission):
+            restriction_id = AuthorRestriction.objects.get_restriction_id(request.user, permission)
+            if restriction_id is None:
+                return queryset.filter(author=request.user)
+            return queryset.filter(author__in=AuthorRestriction.allowed_authors(restriction_id))
         else:
             return queryset.filter(author=request.user)
 
 
 class ResourceFilterBackend(filters.BaseFilterBackend):
     def filter_queryset(self, request, queryset, view):
-        return queryset.filter(owner=request.user.user.owner)
\ No newline at end of file
+        return queryset.filter(owner=get_tenant_context(request).owner_id)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """Searches the full-text index of the model, when it indexes the search fields of the view, ranking the results.
+
+    Terms between double quotes are searched as phrases. Results are ordered from the most relevant one, unless an
+    ordering is requested. Other models are searched as SearchFilter does.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = getattr(view, 'search_fields', None)
+        if not search_fields or not can_search(queryset, search_fields):
+            return super(FullTextSearchFilter, self).filter_queryset(request, queryset, view)
+        terms = get_search_terms(request.QUERY_PARAMS.get(self.search_param, ''))
+        if not terms:
+            return queryset
+        return search_queryset(queryset, terms, search_fields).order_by('-search_rank', '-pk')
+
+
+class TenantFilterBackend(filters.DjangoFilterBackend):
+    """Filters with the filter set of the view, as DjangoFilterBackend does, giving its filters the tenant context.
+
+    Filters looking up other objects by the values of the request read its owner from their "tenant_context".
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filter_class = self.get_filter_class(view, queryset)
+        if not filter_class:
+            return queryset
+        filter_set = filter_class(request.QUERY_PARAMS, queryset=queryset)
+        for filter_ in filter_set.filters.values():
+            filter_.tenant_context = get_tenant_context(request)
+        return filter_set.qs
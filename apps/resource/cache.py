@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.contrib.sites.models import Site as ContribSite
+from django.db import connection, transaction
+
+
+# Restrictions are security checks, so a restriction changed where the cache is not shared is not kept for long
+AUTHOR_RESTRICTIONS_TIMEOUT = 5 * 60
+SITE_IDS_MAX_SIZE = 1024
+SITE_IDS_TIMEOUT = 5 * 60
+LIST_COUNTS_TIMEOUT = 5 * 60
+RESPONSES_TIMEOUT = 5 * 60
+CATEGORY_TREES_TIMEOUT = 5 * 60
+# Publications are published and unpublished by their dates, without any change being saved
+CATEGORY_COUNTS_TIMEOUT = 5 * 60
+
+
+def can_populate():
+    """Returns True if values read from the database may be stored in the cache.
+
+    Values read inside a transaction may be rolled back, so they are never cached.
+    """
+    return not connection.in_atomic_block
+
+
+_pending = threading.local()
+
+
+def defer_invalidation(invalidate, *args):
+    """Makes an invalidation run inside a transaction again once the transaction ends, with atomic_write.
+
+    Until the write is committed, other connections still read the data from before it, and may cache it under the
+    keys just invalidated.
+    """
+    if connection.in_atomic_block:
+        if not hasattr(_pending, 'invalidations'):
+            _pending.invalidations = set()
+        _pending.invalidations.add((invalidate, args))
+
+
+@contextmanager
+def atomic_write(using=None):
+    """Runs a write in a transaction, and makes the cache invalidations of the write again after it ends."""
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        if not transaction.get_connection(using).in_atomic_block:
+            invalidations = getattr(_pending, 'invalidations', ())
+            _pending.invalidations = set()
+            for invalidate, args in invalidations:
+                invalidate(*args)
+
+
+def new_version():
+    """Returns a version never used before by a group of keys whose version was evicted from the cache.
+
+    Restarting from a known value could read again keys stored under it, which may be stale.
+    """
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Returns the current version of a group of cache keys."""
+    key = 'version:{0}'.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(name):
+    """Invalidates every key of a group at once by incrementing its version."""
+    key = 'version:{0}'.format(name)
+    if not cache.add(key, new_version(), None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), None)
+    defer_invalidation(bump_version, name)
+
+
+def author_restrictions_key(user_id):
+    return 'author_restriction_ids:{0}:{1}'.format(get_version('author_restrictions'), user_id)
+
+
+def get_author_restrictions(user_id):
+    """Returns a dict mapping permissions to the cached restrictions of the user."""
+    return cache.get(author_restrictions_key(user_id), {})
+
+
+def set_author_restrictions(user_id, restrictions):
+    if can_populate():
+        cache.set(author_restrictions_key(user_id), restrictions, AUTHOR_RESTRICTIONS_TIMEOUT)
+
+
+def invalidate_author_restrictions(user_id=None):
+    """Drops the cached restrictions of a user, or of every user if no user is given."""
+    if user_id is None:
+        bump_version('author_restrictions')
+    else:
+        cache.delete(author_restrictions_key(user_id))
+        defer_invalidation(invalidate_author_restrictions, user_id)
+
+
+def list_count_key(owner_id, fingerprint):
+    return 'list_count:{0}:{1}:{2}:{3}'.format(get_version('list_counts'), owner_id,
+                                                get_version('list_counts:{0}'.format(owner_id)), fingerprint)
+
+
+def get_list_count(owner_id, fingerprint):
+    """Returns the cached count of a list of the owner and whether it is exact, or None if it is not cached."""
+    return cache.get(list_count_key(owner_id, fingerprint))
+
+
+def set_list_count(owner_id, fingerprint, count, exact):
+    if can_populate():
+        cache.set(list_count_key(owner_id, fingerprint), (count, exact), LIST_COUNTS_TIMEOUT)
+
+
+def invalidate_list_counts(owner_id=None):
+    """Drops the cached list counts of an owner, or of every owner if no owner is given."""
+    if owner_id is None:
+        bump_version('list_counts')
+    else:
+        bump_version('list_counts:{0}'.format(owner_id))
+
+
+def response_key(owner_id, fingerprint):
+    return 'response:{0}:{1}:{2}:{3}'.format(get_version('responses'), owner_id,
+                                              get_version('responses:{0}'.format(owner_id)), fingerprint)
+
+
+def get_cached_response(owner_id, fingerprint):
+    """Returns the cached data and validators of a response to the owner, or None if it is not cached."""
+    return cache.get(response_key(owner_id, fingerprint))
+
+
+def set_cached_response(owner_id, fingerprint, data, etag, last_modified, timeout=RESPONSES_TIMEOUT):
+    if can_populate() and timeout > 0:
+        cache.set(response_key(owner_id, fingerprint), (data, etag, last_modified), timeout)
+
+
+def invalidate_responses(owner_id=None):
+    """Drops the cached responses to an owner, or to every owner if no owner is given."""
+    if owner_id is None:
+        bump_version('responses')
+    else:
+        bump_version('responses:{0}'.format(owner_id))
+
+
+def category_tree_key(owner_id, fingerprint):
+    return 'category_tree:{0}:{1}:{2}:{3}'.format(get_version('category_trees'), owner_id,
+                                                   get_version('category_trees:{0}'.format(owner_id)), fingerprint)
+
+
+def get_category_tree(owner_id, fingerprint):
+    """Returns the cached category tree of a request of the owner, or None if it is not cached."""
+    return cache.get(category_tree_key(owner_id, fingerprint))
+
+
+def set_category_tree(owner_id, fingerprint, tree):
+    if can_populate():
+        cache.set(category_tree_key(owner_id, fingerprint), tree, CATEGORY_TREES_TIMEOUT)
+
+
+def invalidate_category_trees(owner_id=None):
+    """Drops the cached category trees of an owner, or of every owner if no owner is given."""
+    if owner_id is None:
+        bump_version('category_trees')
+    else:
+        bump_version('category_trees:{0}'.format(owner_id))
+
+
+def category_counts_key(owner_id, fingerprint):
+    return 'category_counts:{0}:{1}:{2}:{3}'.format(get_version('category_counts'), owner_id,
+                                                     get_version('category_counts:{0}'.format(owner_id)), fingerprint)
+
+
+def get_category_counts(owner_id, fingerprint):
+    """Returns the cached item counts of the categories of a request of the owner, or None if they are not cached."""
+    return cache.get(category_counts_key(owner_id, fingerprint))
+
+
+def set_category_counts(owner_id, fingerprint, counts):
+    if can_populate():
+        cache.set(category_counts_key(owner_id, fingerprint), counts, CATEGORY_COUNTS_TIMEOUT)
+
+
+def invalidate_category_counts(owner_id=None):
+    """Drops the cached item counts of the categories of an owner, or of every owner if no owner is given."""
+    if owner_id is None:
+        bump_version('category_counts')
+    else:
+        bump_version('category_counts:{0}'.format(owner_id))
+
+
+class LRUCache(object):
+    """A thread safe in-process cache dropping the least recently used keys and keys older than the timeout.
+
+    Changes made by other processes are only seen once a key expires, so the timeout bounds how stale a value can be.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                return default
+            if expires < time.time():
+                return default
+            self._data[key] = (value, expires)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, time.time() + self.timeout)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+site_ids = LRUCache(SITE_IDS_MAX_SIZE, SITE_IDS_TIMEOUT)
+_missing = object()
+
+
+def get_site_id(domain):
+    """Returns the id of the site registered for the domain, or None if there is none.
+
+    Unknown domains are not cached, so sites created by other processes are found at once.
+    """
+    site_id = site_ids.get(domain, _missing)
+    if site_id is _missing:
+        site_id = ContribSite.objects.filter(domain=domain).order_by('id').values_list('id', flat=True).first()
+        if site_id is not None and can_populate():
+            site_ids.set(domain, site_id)
+    return site_id
+
+
+def invalidate_site_ids():
+    site_ids.clear()
+    defer_invalidation(invalidate_site_ids)
+
+
+site_registrations = LRUCache(SITE_IDS_MAX_SIZE, SITE_IDS_TIMEOUT)
+
+
+def is_site_registered(owner_id, site_id):
+    """Returns True if the owner is known to have registered the site, False if it is unknown."""
+    return site_registrations.get((owner_id, site_id), False)
+
+
+def set_site_registered(owner_id, site_id):
+    if can_populate():
+        site_registrations.set((owner_id, site_id), True)
+
+
+def invalidate_site_registrations():
+    site_registrations.clear()
+    defer_invalidation(invalidate_site_registrations)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import calendar
+import hashlib
+
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+
+def get_etag(request, *parts):
+    """Returns a weak ETag of a representation of the parts, for the request user, host and query.
+
+    Rendered URLs depend on the host and the query selects the page and format, so they are part of the tag.
+    """
+    http_request = getattr(request, '_request', request)
+    key = [request.user.pk, http_request.get_host(), http_request.META.get('QUERY_STRING', '')]
+    key.extend(parts)
+    return 'W/' + quote_etag(hashlib.md5(force_bytes(repr(key))).hexdigest())
+
+
+def get_timestamp(date):
+    return calendar.timegm(date.utctimetuple())
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """Returns True if the client already holds the representation with the ETag or modification date."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # Tags are compared weakly, ignoring their weakness indicators
+        etags = parse_etags(if_none_match)
+        return '*' in etags or parse_etags(etag)[0] in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since is not None and last_modified is not None:
+        return get_timestamp(last_modified) <= if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(get_timestamp(last_modified))
+    return response
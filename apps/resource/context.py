@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from django.utils.functional import cached_property
+
+from apps.resource.cache import get_site_id
+from apps.resource.models import AuthUser, User
+
+
+def get_request_domain(request):
+    """Returns the domain the request was made to, as used to select the site."""
+    domain = request.META.get('HTTP_HOST')
+    if not domain:
+        domain = request.META.get('SERVER_NAME')
+    return domain
+
+
+class TenantContext(object):
+    """Holds the account data of a request, resolving each value at most once.
+
+    The owner, site and permissions are loaded lazily, so a request only pays for the values it actually uses.
+    """
+
+    def __init__(self, user, domain):
+        self.user = user
+        self.domain = domain
+
+    @cached_property
+    def owner_id(self):
+        if self.user.pk is None:
+            return None
+        return User.objects.values_list('owner', flat=True).get(user=self.user)
+
+    @cached_property
+    def owner(self):
+        """The account owner, reusing the request user when the user is the owner itself."""
+        if self.owner_id == self.user.pk:
+            return self.user
+        return AuthUser.objects.get(pk=self.owner_id)
+
+    @cached_property
+    def site_id(self):
+        """Id of the site registered for the request domain, or None if the domain is unknown."""
+        return get_site_id(self.domain)
+
+    @cached_property
+    def permissions(self):
+        if not self.user.is_active:
+            return frozenset()
+        return frozenset(self.user.get_all_permissions())
+
+    def has_perm(self, permission):
+        return permission in self.permissions
+
+
+def get_tenant_context(request):
+    """Returns the tenant context of the request, building it on first access.
+
+    Accepts both Django and REST framework requests. The context is stored on the underlying Django request, so
+    every backend, serializer and view of the same request shares it. It is rebuilt if the user or domain change.
+    """
+    http_request = getattr(request, '_request', request)
+    user = request.user
+    domain = get_request_domain(http_request)
+    context = getattr(http_request, '_tenant_context', None)
+    if context is None or context.user is not user or context.domain != domain:
+        context = TenantContext(user, domain)
+        http_request._tenant_context = context
+    return context
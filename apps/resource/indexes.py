@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from django.db import connections
+from django.db.backends.utils import truncate_name
+from django.db.models import CharField, Lookup
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+from django.utils.encoding import force_text
+
+logger = logging.getLogger(__name__)
+
+_composite_indexes = {}
+
+_prefix_indexes = {}
+
+
+def register_composite_indexes(model, *index_together):
+    """Declares indexes over several columns of the table of the model, created after each migrate.
+
+    The fields of an index must be local to the model. Models inheriting from other models share the Meta options
+    of their parents, so these indexes can't be declared in index_together without being copied to every child.
+    """
+    _composite_indexes.setdefault(model, []).extend(tuple(fields) for fields in index_together)
+
+
+def get_invalid_indexes(connection, table):
+    """Returns the names of the indexes of the table that PostgreSQL doesn't use.
+
+    A failed concurrent build leaves an invalid index behind, which is kept until it is dropped.
+    """
+    if connection.vendor != 'postgresql':
+        return set()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                       'JOIN pg_class t ON t.oid = i.indrelid WHERE t.relname = %s AND NOT i.indisvalid', [table])
+        return set(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def get_missing_indexes(model, using):
+    """Returns the columns of the registered indexes of the model that are not in its table yet, or are invalid."""
+    connection = connections[using]
+    table = model._meta.db_table
+    cursor = connection.cursor()
+    try:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    finally:
+        cursor.close()
+    invalid = get_invalid_indexes(connection, table)
+    existing = set(tuple(constraint['columns']) for name, constraint in constraints.items()
+                   if constraint['index'] and name not in invalid)
+    indexes = [tuple(model._meta.get_field(name).column for name in fields)
+               for fields in _composite_indexes.get(model, ())]
+    return [columns for columns in indexes if columns not in existing]
+
+
+def create_index(connection, name, table, expression):
+    """Creates the index of the expression on the table, unless there is already an index of the name.
+
+    PostgreSQL builds it concurrently, so writes to the table are not blocked meanwhile. Concurrent builds can't run in
+    a transaction, so the index is built as usual inside one. An invalid index of the name, left by a failed concurrent
+    build, is dropped and built again.
+    """
+    quote_name = connection.ops.quote_name
+    concurrently = connection.vendor == 'postgresql' and connection.get_autocommit() and \
+        not connection.in_atomic_block
+    cursor = connection.cursor()
+    try:
+        if name in get_invalid_indexes(connection, table):
+            logger.warning('Rebuilding the invalid index %s of the table %s', name, table)
+            cursor.execute('DROP INDEX {0}IF EXISTS {1}'.format('CONCURRENTLY ' if concurrently else '',
+                                                                  quote_name(name)))
+        cursor.execute('CREATE INDEX {0}IF NOT EXISTS {1} ON {2} ({3})'.format(
+            'CONCURRENTLY ' if concurrently else '', quote_name(name), quote_name(table), expression))
+    finally:
+        cursor.close()
+
+
+def create_composite_indexes(models, using):
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    for model in models:
+        table = model._meta.db_table
+        for columns in get_missing_indexes(model, using):
+            name = truncate_name('{0}_{1}_idx'.format(table, '_'.join(columns)), connection.ops.max_name_length())
+            create_index(connection, name, table, ', '.join(quote_name(column) for column in columns))
+
+
+def register_prefix_indexes(model, *fields):
+    """Declares indexes finding the values of text fields of the model by a prefix, with the "prefix" lookup.
+
+    The fields must be local to the model. The indexes are created after each migrate.
+    """
+    _prefix_indexes.setdefault(model, []).extend(fields)
+
+
+def get_prefix_expression(column, connection):
+    """Returns the case insensitive expression of a column that prefix indexes hold and prefix lookups compare."""
+    if connection.vendor == 'sqlite':
+        return '{0} COLLATE NOCASE'.format(column)
+    return connection.ops.lookup_cast('istartswith') % column
+
+
+def create_prefix_indexes(models, using):
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    for model in models:
+        table = model._meta.db_table
+        for name in _prefix_indexes[model]:
+            column = model._meta.get_field(name).column
+            expression = get_prefix_expression(quote_name(column), connection)
+            if connection.vendor == 'postgresql':
+                # LIKE compares patterns character by character, whatever the collation of the database
+                expression = '({0}) text_pattern_ops'.format(expression)
+            index = truncate_name('{0}_{1}_prefix'.format(table, column), connection.ops.max_name_length())
+            create_index(connection, index, table, expression)
+
+
+def order_by_prefix_expression(queryset, name):
+    """Orders the queryset by the case insensitive value of the text field, as its prefix index does."""
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    field = queryset.model._meta.get_field(name)
+    column = '{0}.{1}'.format(quote_name(field.model._meta.db_table), quote_name(field.column))
+    ordering = '{0}_prefix'.format(name)
+    return queryset.extra(select={ordering: get_prefix_expression(column, connection)}, order_by=[ordering])
+
+
+class PrefixLookup(Lookup):
+    """Case insensitive "starts with" lookup, whose SQL can be answered by the prefix indexes.
+
+    SQLite doesn't use indexes for LIKE comparisons with parameters, so it compares a range of values instead.
+    """
+    lookup_name = 'prefix'
+
+    def as_sql(self, qn, connection):
+        lhs, params = self.process_lhs(qn, connection)
+        prefix = force_text(self.rhs)
+        expression = get_prefix_expression(lhs, connection)
+        if connection.vendor == 'sqlite':
+            return '{0} >= %s AND {0} < %s'.format(expression), params + [prefix] + params + [prefix + u'\uffff']
+        pattern = connection.ops.prep_for_like_query(prefix) + '%'
+        return '{0} {1}'.format(expression, connection.operators['istartswith'] % '%s'), params + [pattern]
+
+
+CharField.register_lookup(PrefixLookup)
+
+
+@receiver(post_migrate)
+def create_registered_indexes(sender, using, **kwargs):
+    create_composite_indexes([model for model in _composite_indexes if model._meta.app_config is sender], using)
+    create_prefix_indexes([model for model in _prefix_indexes if model._meta.app_config is sender], using)
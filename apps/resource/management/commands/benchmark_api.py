@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import timeit
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.db.models import F
+from django.test.client import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from test_fixtures import ScaledFixtures
+from urls import router
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of the values."""
+    values = sorted(values)
+    index = int(round(percent / 100.0 * len(values) + 0.5)) - 1
+    return values[max(0, min(index, len(values) - 1))]
+
+
+class Command(BaseCommand):
+    help = 'Measures the throughput and latency of the API endpoints on a test database filled with scaled ' \
+           'fixtures. The database is the one configured in the settings, so it runs on SQLite or PostgreSQL.'
+    option_list = BaseCommand.option_list + (
+        make_option('--owners', type='int', default=2, help='Number of owners.'),
+        make_option('--users', type='int', default=5, help='Number of users of each owner.'),
+        make_option('--sites', type='int', default=5, help='Number of sites of each owner.'),
+        make_option('--categories', type='int', default=100, help='Number of categories of each owner.'),
+        make_option('--category-depth', type='int', default=5, help='Depth of the category trees.'),
+        make_option('--publications', type='int', default=1000, help='Number of news of each owner.'),
+        make_option('--pages', type='int', default=10, help='Number of pages of each owner.'),
+        make_option('--subscriptions', type='int', default=1000, help='Number of subscriptions of each owner.'),
+        make_option('--restrictions', type='int', default=10, help='Number of author restrictions of each owner.'),
+        make_option('--requests', type='int', default=100, help='Number of requests timed for each endpoint.'),
+        make_option('--endpoints', default='', help='Comma separated URL prefixes to benchmark. Defaults to all.'),
+        make_option('--output', default='', help='File the JSON results are written to. Defaults to stdout.'),
+    )
+
+    def handle(self, *args, **options):
+        prefixes = [prefix for prefix, viewset, base_name in router.registry]
+        if options['endpoints']:
+            selected = options['endpoints'].split(',')
+            unknown = set(selected) - set(prefixes)
+            if unknown:
+                raise CommandError('Unknown endpoints: {0}'.format(', '.join(sorted(unknown))))
+            prefixes = selected
+        old_name = connection.creation.create_test_db(verbosity=0)
+        setup_test_environment()
+        try:
+            fixture = ScaledFixtures(
+                self, owners=options['owners'], users=options['users'], sites=options['sites'],
+                categories=options['categories'], category_depth=options['category_depth'],
+                publications=options['publications'], pages=options['pages'],
+                subscriptions=options['subscriptions'], restrictions=options['restrictions'])
+            fixture.create()
+            results = []
+            for prefix, viewset, base_name in router.registry:
+                if prefix in prefixes:
+                    results.append(self.benchmark_list(fixture, base_name, options['requests']))
+                    result = self.benchmark_detail(fixture, viewset, base_name, options['requests'])
+                    if result['requests']:
+                        results.append(result)
+            report = {
+                'date': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'dataset': dict((name, options[name]) for name in (
+                    'owners', 'users', 'sites', 'categories', 'category_depth', 'publications', 'pages',
+                    'subscriptions', 'restrictions')),
+                'endpoints': results,
+            }
+        finally:
+            teardown_test_environment()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def benchmark_list(self, fixture, base_name, requests):
+        url = reverse('{0}-list'.format(base_name))
+        return self.benchmark(fixture, '{0}-list'.format(base_name),
+                              lambda token: (url, random.choice(fixture.domains[token])), requests)
+
+    def benchmark_detail(self, fixture, viewset, base_name, requests):
+        # Owners without author restrictions can only access the objects they wrote
+        queryset = viewset.model.objects.filter(owner__in=fixture.owner_ids.values(), author=F('owner'))
+        objects_by_owner = {}
+        for owner_id, pk, domain in queryset.values_list('owner', 'id', 'sites__domain'):
+            if domain:
+                objects_by_owner.setdefault(owner_id, []).append((pk, domain))
+
+        def get_url(token):
+            objects = objects_by_owner.get(fixture.owner_ids[token])
+            if not objects:
+                return None, None
+            pk, domain = random.choice(objects)
+            return reverse('{0}-detail'.format(base_name), args=[pk]), domain
+        return self.benchmark(fixture, '{0}-detail'.format(base_name), get_url, requests)
+
+    def benchmark(self, fixture, name, get_url, requests):
+        """Times the requests made by random owners to the URLs and site domains returned by get_url."""
+        client = Client()
+        latencies = []
+        errors = 0
+        for number in range(requests + 1):
+            token = random.choice(fixture.tokens)
+            url, domain = get_url(token)
+            if url is None:
+                break
+            start = timeit.default_timer()
+            response = client.get(url, HTTP_AUTHORIZATION='Bearer {0}'.format(token), HTTP_HOST=domain)
+            elapsed = timeit.default_timer() - start
+            # The first request only warms the caches
+            if number:
+                latencies.append(elapsed)
+                if response.status_code != 200:
+                    errors += 1
+        result = {'endpoint': name, 'requests': len(latencies), 'errors': errors}
+        if latencies:
+            result.update({
+                'throughput': len(latencies) / sum(latencies),
+                'mean_ms': sum(latencies) * 1000 / len(latencies),
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+            })
+        return result
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+import timeit
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from apps.resource.models import AuthUser
+from apps.resource.prefetch import apply_related_lookups
+from test_fixtures import ScaledFixtures
+from urls import router
+
+
+class Command(BaseCommand):
+    help = 'Measures how fast the serializer of each API endpoint is built and renders pages of objects, on a test ' \
+           'database filled with scaled fixtures.'
+    option_list = BaseCommand.option_list + (
+        make_option('--publications', type='int', default=100, help='Number of news of the owner.'),
+        make_option('--page-size', type='int', default=100, help='Number of objects rendered at once.'),
+        make_option('--repeat', type='int', default=200, help='Number of times each measure is repeated.'),
+        make_option('--output', default='', help='File the JSON results are written to. Defaults to stdout.'),
+    )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0)
+        setup_test_environment()
+        try:
+            fixture = ScaledFixtures(self, owners=1, users=5, sites=1, categories=20, category_depth=3,
+                                     publications=options['publications'], pages=options['publications'],
+                                     subscriptions=options['publications'], restrictions=10)
+            fixture.create()
+            token = fixture.tokens[0]
+            request = APIRequestFactory().get('/', HTTP_HOST=fixture.domains[token][0])
+            request.user = AuthUser.objects.get(pk=fixture.owner_ids[token])
+            results = []
+            for prefix, viewset, base_name in router.registry:
+                view = viewset(request=request, format_kwarg=None, kwargs={})
+                results.append(self.benchmark(view, options['page_size'], options['repeat']))
+            report = {
+                'date': timezone.now().isoformat(),
+                'page_size': options['page_size'],
+                'serializers': results,
+            }
+        finally:
+            teardown_test_environment()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def benchmark(self, view, page_size, repeat):
+        """Times building the serializer of the view, and rendering a page of the objects of the request owner."""
+        serializer_class = view.get_serializer_class()
+        context = view.get_serializer_context()
+        queryset = view.model.objects.filter(owner=view.request.user).order_by('-id')
+        objects = list(apply_related_lookups(queryset, serializer_class(context=context))[:page_size])
+
+        def instantiate():
+            serializer_class(context=context)
+
+        def render():
+            serializer_class(objects, many=True, context=context).data
+
+        instantiate()
+        render()
+        instantiation_time = timeit.timeit(instantiate, number=repeat)
+        render_time = timeit.timeit(render, number=repeat)
+        result = {
+            'serializer': serializer_class.__name__,
+            'objects': len(objects),
+            'instantiations_per_second': repeat / instantiation_time,
+        }
+        if objects:
+            result['objects_per_second'] = repeat * len(objects) / render_time
+        return result
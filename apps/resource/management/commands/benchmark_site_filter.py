@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import random
+import timeit
+from optparse import make_option
+
+from django.contrib.auth.models import User as AuthUser
+from django.contrib.sites.models import Site as ContribSite
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import HttpRequest
+
+from apps.news.models import News
+from apps.resource.backends import SiteDomainFilterBackend
+from apps.resource.cache import invalidate_site_ids
+from apps.resource.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compares the latency of paginated news lists filtered by site domain and by the cached site id, on a test database.'
+    option_list = BaseCommand.option_list + (
+        make_option('--sites', type='int', default=50, help='Number of sites of the owner.'),
+        make_option('--news', type='int', default=1000, help='Number of news of the owner.'),
+        make_option('--sites-per-news', type='int', default=5, help='Number of sites each news is published in.'),
+        make_option('--repeat', type='int', default=200, help='Number of lists timed for each filter.'),
+    )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            domains = self.create_dataset(options['sites'], options['news'], options['sites_per_news'])
+            queryset = News.objects.all()
+            page_size = 10
+
+            def make_request():
+                request = HttpRequest()
+                request.user = None
+                request.META['HTTP_HOST'] = random.choice(domains)
+                return request
+
+            def filter_by_domain():
+                request = make_request()
+                filtered = queryset.filter(sites__domain=request.META['HTTP_HOST'])
+                filtered.count()
+                list(filtered[:page_size])
+
+            def filter_by_site_id():
+                request = make_request()
+                filtered = SiteDomainFilterBackend().filter_queryset(request, queryset, view=None)
+                filtered.count()
+                list(filtered[:page_size])
+
+            invalidate_site_ids()
+            for name, function in (('sites__domain', filter_by_domain), ('sites__id', filter_by_site_id)):
+                function()
+                elapsed = timeit.timeit(function, number=options['repeat'])
+                self.stdout.write('{0}: {1:.3f} ms per list'.format(name, elapsed * 1000 / options['repeat']))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def create_dataset(self, sites, news, sites_per_news):
+        with transaction.atomic():
+            owner = AuthUser.objects.create_user('benchmark', 'benchmark@benchmark.com', '123')
+            User.objects.create(user=owner, owner=owner, author=owner)
+            site_list = [ContribSite.objects.create(domain='site{0}.benchmark.com'.format(i)) for i in range(sites)]
+            through = News.sites.through
+            relations = []
+            for i in range(news):
+                obj = News.objects.create(owner=owner, author=owner, title='News {0}'.format(i), content='Content')
+                for site in random.sample(site_list, min(sites_per_news, sites)):
+                    relations.append(through(resource_id=obj.id, site_id=site.id))
+            through.objects.bulk_create(relations)
+        return [site.domain for site in site_list]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIRequestFactory
+
+from apps.resource.queries import explain_queryset
+from test_fixtures import ScaledFixtures
+from urls import router
+
+
+class Command(BaseCommand):
+    help = 'Prints the plan of the query of the first page of each API list, on a test database filled with scaled ' \
+           'fixtures, and flags the tables read by sequential scans. Plans are read on PostgreSQL and SQLite.'
+    option_list = BaseCommand.option_list + (
+        make_option('--owners', type='int', default=2, help='Number of owners.'),
+        make_option('--categories', type='int', default=100, help='Number of categories of each owner.'),
+        make_option('--publications', type='int', default=1000, help='Number of news of each owner.'),
+        make_option('--pages', type='int', default=100, help='Number of pages of each owner.'),
+        make_option('--subscriptions', type='int', default=1000, help='Number of subscriptions of each owner.'),
+        make_option('--endpoints', default='', help='Comma separated URL prefixes to explain. Defaults to all.'),
+    )
+
+    def handle(self, *args, **options):
+        prefixes = [prefix for prefix, viewset, base_name in router.registry]
+        if options['endpoints']:
+            selected = options['endpoints'].split(',')
+            unknown = set(selected) - set(prefixes)
+            if unknown:
+                raise CommandError('Unknown endpoints: {0}'.format(', '.join(sorted(unknown))))
+            prefixes = selected
+        old_name = connection.creation.create_test_db(verbosity=0)
+        setup_test_environment()
+        flagged = 0
+        try:
+            fixture = ScaledFixtures(
+                self, owners=options['owners'], categories=options['categories'],
+                publications=options['publications'], pages=options['pages'],
+                subscriptions=options['subscriptions'])
+            fixture.create()
+            cursor = connection.cursor()
+            cursor.execute('ANALYZE')
+            cursor.close()
+            token = fixture.tokens[0]
+            for prefix, viewset, base_name in router.registry:
+                if prefix in prefixes:
+                    queryset = self.get_page_queryset(viewset, base_name, token, fixture.domains[token][0])
+                    lines, scans = explain_queryset(queryset)
+                    self.stdout.write('{0}:'.format(prefix))
+                    for line in lines:
+                        self.stdout.write('    {0}'.format(line))
+                    for table in scans:
+                        self.stdout.write('    Sequential scan of {0}'.format(table))
+                    flagged += bool(scans)
+        finally:
+            teardown_test_environment()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        self.stdout.write('{0} of {1} lists read tables sequentially.'.format(flagged, len(prefixes)))
+
+    def get_page_queryset(self, viewset, base_name, token, domain):
+        """Returns the queryset of the first page of the list, as the viewset builds it for the owner of the token."""
+        request = APIRequestFactory().get(reverse('{0}-list'.format(base_name)), HTTP_HOST=domain,
+                                          HTTP_AUTHORIZATION='Bearer {0}'.format(token))
+        view = viewset(action_map={'get': 'list'}, args=(), kwargs={})
+        view.request = view.initialize_request(request)
+        view.headers = view.default_response_headers
+        view.initial(view.request)
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset[:view.get_paginate_by() or 10]
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import NoArgsCommand
+
+from apps.resource.models import AuthorRestriction
+
+
+class Command(NoArgsCommand):
+    help = 'Copies the comma separated filter values of every author restriction to its authors relation.'
+
+    def handle_noargs(self, **options):
+        restrictions = AuthorRestriction.objects.all()
+        for restriction in restrictions:
+            restriction.sync_authors()
+        self.stdout.write('Synchronized {0} author restrictions.'.format(len(restrictions)))
@@ -2,6 +2,14 @@ from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.models import User as AuthUser, Group as AuthGroup, Permission
 from django.contrib.sites.models import Site as ContribSite
 from django.db import models, IntegrityError
+from django.db.models import Q
+from django.db.models.signals import class_prepared, post_save, post_delete, post_migrate, m2m_changed
+from django.dispatch import receiver
+from django.utils.encoding import force_text
+
+from apps.resource.cache import get_author_restrictions, set_author_restrictions, invalidate_author_restrictions, \
+    invalidate_site_ids, invalidate_site_registrations, invalidate_list_counts, invalidate_responses
+from apps.resource.indexes import register_composite_indexes
 
 
 class Common(models.Model):
@@ -16,6 +24,58 @@ class Common(models.Model):
     creation_date = models.DateTimeField(_('creation date'), auto_now_add=True)
     last_modification_date = models.DateTimeField(_('last modification date'), auto_now=True)
 
+    def __init__(self, *args, **kwargs):
+        super(Common, self).__init__(*args, **kwargs)
+        self._loaded_values = self.get_field_values()
+
+    def get_field_values(self):
+        """Returns the values of the fields loaded in the instance, by attribute name."""
+        return dict((field.attname, self.__dict__[field.attname]) for field in self._meta.concrete_fields
+                    if field.attname in self.__dict__)
+
+    def get_changed_fields(self):
+        """Returns the names of the fields whose values changed since the instance was loaded or saved."""
+        return [field.name for field in self._meta.concrete_fields
+                if not field.primary_key and self._field_has_changed(field)]
+
+    def has_changed(self, name):
+        """Returns whether the value of the field changed since the instance was loaded or saved.
+
+        The fields of instances never saved are all changed.
+        """
+        return self._state.adding or self._field_has_changed(self._meta.get_field(name))
+
+    def get_last_modified(self):
+        """Returns the date of the last change of the representation of the instance."""
+        return self.last_modification_date
+
+    def _field_has_changed(self, field):
+        if field.attname not in self.__dict__:
+            # Deferred fields not assigned keep their value
+            return False
+        if field.attname not in self._loaded_values:
+            return True
+        try:
+            return self.__dict__[field.attname] != self._loaded_values[field.attname]
+        except TypeError:
+            # Naive and aware datetimes can't be compared
+            return True
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """Saves the instance, updating only the changed fields of instances loaded from the database.
+
+        The last modification date is always updated, so saves without changes still touch the instance.
+        """
+        if update_fields is None and not force_insert and not self._state.adding and \
+                self.pk is not None and self.pk == self._loaded_values.get(self._meta.pk.attname):
+            update_fields = self.get_changed_fields()
+            if 'last_modification_date' not in update_fields:
+                update_fields.append('last_modification_date')
+        super(Common, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                 update_fields=update_fields)
+        self._loaded_values = self.get_field_values()
+
     class Meta:
         abstract = True
         default_permissions = ('view', 'add', 'change', 'delete')
@@ -48,7 +108,8 @@ class Group(Resource):
              update_fields=None):
         name = '{0} - {1}'.format(self.owner, self.role)
         self.group = AuthGroup.objects.get_or_create(name=name)[0]
-        super(Group, self).save()
+        super(Group, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                update_fields=update_fields)
 
     def __str__(self):
         return '{0} - {1}'.format(self.owner, self.role)
@@ -80,6 +141,34 @@ class Site(Resource):
         verbose_name_plural = _('sites')
 
 
+class AuthorRestrictionQuerySet(models.QuerySet):
+
+    def get_restriction_id(self, user, permission):
+        """Returns the id of the restriction that limits the authors the user can access with the permission.
+
+        None is returned when there is no restriction for the user, meaning he can access just his own objects.
+        The result is cached per user and permission, so hot requests do not hit the database.
+        """
+        restrictions = get_author_restrictions(user.pk)
+        if permission not in restrictions:
+            app_label, codename = permission.split('.')
+            restriction_ids = self.filter(
+                Q(permission__content_type__app_label=app_label), Q(permission__codename=codename),
+                Q(user=user) | Q(group__in=user.groups.all())).values_list('id', flat=True)[:1]
+            restrictions[permission] = restriction_ids[0] if restriction_ids else None
+            set_author_restrictions(user.pk, restrictions)
+        return restrictions[permission]
+
+    def update(self, **kwargs):
+        rows = super(AuthorRestrictionQuerySet, self).update(**kwargs)
+        invalidate_author_restrictions()
+        return rows
+
+    def delete(self):
+        super(AuthorRestrictionQuerySet, self).delete()
+        invalidate_author_restrictions()
+
+
 class AuthorRestriction(Resource):
     filter_values = models.TextField(_('filter values'))
     permission = models.ForeignKey(Permission, verbose_name=_('permission'))
@@ -87,6 +176,19 @@ class AuthorRestriction(Resource):
                              related_name='creator_restrictions')
     group = models.ForeignKey(AuthGroup, verbose_name=_('group'), null=True, blank=True,
                               related_name='creator_restrictions')
+    authors = models.ManyToManyField(AuthUser, verbose_name=_('authors'), blank=True, editable=False,
+                                     related_name='allowed_by_restrictions')
+
+    objects = AuthorRestrictionQuerySet.as_manager()
+
+    @classmethod
+    def allowed_authors(cls, restriction_id):
+        """Returns a subquery with the ids of the authors allowed by a restriction."""
+        return cls.authors.through.objects.filter(authorrestriction=restriction_id).values('user')
+
+    def sync_authors(self):
+        """Stores the authors listed in filter values in the indexed authors relation."""
+        self.authors = AuthUser.objects.filter(id__in=split_filter_values(self.filter_values))
 
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
@@ -100,7 +202,9 @@ class AuthorRestriction(Resource):
                 self.group.permissions.add(self.permission)
             except IntegrityError:
                 pass
-        super(AuthorRestriction, self).save()
+        super(AuthorRestriction, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                            update_fields=update_fields)
+        self.sync_authors()
 
     def delete(self, using=None):
         if self.user:
@@ -124,4 +228,98 @@ class AuthorRestriction(Resource):
 
     class Meta(Common.Meta):
         verbose_name = _('author restriction')
-        verbose_name_plural = _('author restrictions')
\ No newline at end of file
+        verbose_name_plural = _('author restrictions')
+
+
+def split_filter_values(filter_values):
+    """Converts the comma separated filter values of a restriction to a list of author ids."""
+    author_ids = []
+    for value in force_text(filter_values).split(','):
+        try:
+            author_ids.append(int(value))
+        except ValueError:
+            pass
+    return author_ids
+
+
+@receiver(post_save, sender=AuthorRestriction)
+@receiver(post_delete, sender=AuthorRestriction)
+def author_restriction_changed(sender, **kwargs):
+    invalidate_author_restrictions()
+
+
+@receiver(m2m_changed, sender=AuthUser.groups.through)
+def user_groups_changed(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            invalidate_author_restrictions()
+        else:
+            invalidate_author_restrictions(instance.pk)
+        # Responses are cached by permissions, and groups may change the restrictions of users but not their permissions
+        invalidate_responses()
+
+
+@receiver(post_save, sender=ContribSite)
+@receiver(post_delete, sender=ContribSite)
+def contrib_site_changed(sender, **kwargs):
+    invalidate_site_ids()
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def site_changed(sender, **kwargs):
+    invalidate_site_registrations()
+
+
+def resource_changed(sender, instance, **kwargs):
+    invalidate_list_counts(instance.owner_id)
+    invalidate_responses(instance.owner_id)
+
+
+def resource_relations_changed(sender, instance, action, **kwargs):
+    # The instance is the resource, or the related object when the links are changed from it, which may have no owner
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        owner_id = getattr(instance, 'owner_id', None)
+        invalidate_list_counts(owner_id)
+        invalidate_responses(owner_id)
+
+
+def connect_relation_receivers(through):
+    """Drops the cached lists and responses of an owner when the links of its resources in the relation change.
+
+    Links changed after their resources are saved, or from the related objects, are not seen by resource receivers.
+    """
+    m2m_changed.connect(resource_relations_changed, sender=through)
+
+
+def connect_resource_receivers(model):
+    # Receivers are connected to each resource model, as receivers of every model would disable fast deletes.
+    post_save.connect(resource_changed, sender=model)
+    post_delete.connect(resource_changed, sender=model)
+
+
+@receiver(class_prepared)
+def resource_prepared(sender, **kwargs):
+    if issubclass(sender, Resource):
+        connect_resource_receivers(sender)
+
+
+for resource_model in (Resource, Group, User, Site, AuthorRestriction):
+    connect_resource_receivers(resource_model)
+
+for resource_relation in (Resource.sites.through, AuthorRestriction.authors.through):
+    connect_relation_receivers(resource_relation)
+
+# Lists are filtered by owner, then by author, and ordered by creation date. The site filter reads the sites table.
+register_composite_indexes(Resource, ('owner', 'author'), ('owner', 'creation_date'))
+register_composite_indexes(Resource.sites.through, ('site', 'resource'))
+
+
+@receiver(post_migrate)
+def database_reset(sender, **kwargs):
+    # Flushing or migrating the database may reuse ids that are still cached.
+    invalidate_author_restrictions()
+    invalidate_site_ids()
+    invalidate_site_registrations()
+    invalidate_list_counts()
+    invalidate_responses()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.paginator import Paginator, EmptyPage
+from django.db import connections
+from django.db.models import Q
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.http import Http404
+from django.utils import six
+from django.utils.encoding import force_bytes, force_text
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers
+from rest_framework.pagination import BasePaginationSerializer, PaginationSerializer
+from rest_framework.templatetags.rest_framework import replace_query_param
+
+from apps.resource.cache import get_list_count, set_list_count
+
+
+def get_queryset_fingerprint(queryset):
+    """Returns a hash of the SQL of the queryset, which identifies its filters.
+
+    Only the primary keys are selected, so columns and extra values selected by the queryset are left out.
+    Raises EmptyResultSet if the queryset can't match any object.
+    """
+    queryset = queryset.order_by().values_list('pk')
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    return hashlib.md5(force_bytes(repr((sql, params)))).hexdigest()
+
+
+def estimate_count(queryset):
+    """Returns the number of rows the query planner expects the queryset to return, or None if it is unknown.
+
+    Only PostgreSQL plans are read. Their estimates come from the table statistics, so they are much faster to get
+    than an exact count, but may be far from it.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+    cursor = connection.cursor()
+    try:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if isinstance(plan, six.string_types):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_queryset(queryset, owner_id, estimate_threshold=None):
+    """Returns the number of objects of a list of the owner and whether the number is exact.
+
+    Counts are cached until an object of the owner changes, except those of time_dependent querysets, whose SQL
+    holds the current time. Lists the planner expects to have at least estimate_threshold objects are not counted,
+    the estimate is returned instead.
+    """
+    cache_count = not getattr(queryset, 'time_dependent', False)
+    try:
+        fingerprint = get_queryset_fingerprint(queryset)
+    except EmptyResultSet:
+        return 0, True
+    if cache_count:
+        cached = get_list_count(owner_id, fingerprint)
+        if cached is not None:
+            return cached
+    count, exact = None, True
+    if estimate_threshold is not None:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= estimate_threshold:
+            count, exact = estimate, False
+    if count is None:
+        count = queryset.count()
+    if cache_count:
+        set_list_count(owner_id, fingerprint, count, exact)
+    return count, exact
+
+
+class CountingPaginator(Paginator):
+    """Paginator of the lists of an owner, using cached or estimated counts.
+
+    As an estimated count may be lower than the real one, pages past it are not rejected.
+    """
+
+    def __init__(self, object_list, per_page, owner_id=None, estimate_threshold=None, **kwargs):
+        super(CountingPaginator, self).__init__(object_list, per_page, **kwargs)
+        self.owner_id = owner_id
+        self.estimate_threshold = estimate_threshold
+        self._count_exact = True
+
+    def _get_count(self):
+        if self._count is None:
+            self._count, self._count_exact = count_queryset(self.object_list, self.owner_id,
+                                                            self.estimate_threshold)
+        return self._count
+    count = property(_get_count)
+
+    @property
+    def count_exact(self):
+        self._get_count()
+        return self._count_exact
+
+    def validate_number(self, number):
+        try:
+            return super(CountingPaginator, self).validate_number(number)
+        except EmptyPage:
+            if self.count_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_exact:
+            return super(CountingPaginator, self).page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class CountingPaginationSerializer(PaginationSerializer):
+    """Pagination serializer telling whether the count is exact or estimated."""
+    count_exact = serializers.Field(source='paginator.count_exact')
+
+
+def encode_cursor(position, reverse):
+    """Returns an opaque cursor holding the ordering values of an object and the direction to read from it."""
+    data = json.dumps([position, reverse], separators=(',', ':'))
+    return force_text(base64.urlsafe_b64encode(data.encode('utf-8')))
+
+
+def decode_cursor(cursor):
+    """Returns the position and direction held by a cursor, raising ValueError if it is not valid."""
+    try:
+        position, reverse = json.loads(force_text(base64.urlsafe_b64decode(str(cursor))))
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+    if not isinstance(position, list) or not isinstance(reverse, bool):
+        raise ValueError('Invalid cursor')
+    return position, reverse
+
+
+class CursorPage(object):
+    """A page of objects with the cursors of the pages around it."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+
+class CursorPaginator(object):
+    """Paginates a queryset by the values of its ordering fields instead of by offset.
+
+    Each page is read with a filter on the position of the last object of the page before it, so deep pages cost
+    the same as the first one, and no count is made. The last ordering field must be unique, like "id".
+    """
+
+    def __init__(self, queryset, ordering, page_size):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.page_size = page_size
+        self.model_fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in ordering]
+
+    def get_position(self, obj):
+        return [force_text(field.value_to_string(obj)) for field in self.model_fields]
+
+    def parse_position(self, position):
+        if len(position) != len(self.model_fields):
+            raise ValueError('Invalid cursor')
+        try:
+            return [field.to_python(value) for field, value in zip(self.model_fields, position)]
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    def get_position_filter(self, values, reverse):
+        """Returns the lookup of the objects after the position, or before it when reading in reverse."""
+        position_filter = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = '{0}__{1}'.format(name.lstrip('-'), 'lt' if descending else 'gt')
+            condition = Q(**{lookup: values[index]})
+            for previous_index in range(index):
+                condition &= Q(**{self.ordering[previous_index].lstrip('-'): values[previous_index]})
+            position_filter |= condition
+        return position_filter
+
+    def page(self, cursor=None):
+        if cursor:
+            position, reverse = decode_cursor(cursor)
+            values = self.parse_position(position)
+        else:
+            position, reverse, values = None, False, None
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else '-' + name for name in ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.get_position_filter(values, reverse))
+        # One more object tells whether there is a page after this one
+        object_list = list(queryset[:self.page_size + 1])
+        has_more = len(object_list) > self.page_size
+        object_list = object_list[:self.page_size]
+        if reverse:
+            object_list.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        next_cursor = previous_cursor = None
+        if has_next and object_list:
+            next_cursor = encode_cursor(self.get_position(object_list[-1]), False)
+        if has_previous and object_list:
+            previous_cursor = encode_cursor(self.get_position(object_list[0]), True)
+        return CursorPage(object_list, next_cursor, previous_cursor)
+
+
+class CursorField(serializers.Field):
+    """Field that returns a link to the page at one of the cursors of a cursor page."""
+    cursor_field = 'cursor'
+
+    def __init__(self, page_attribute, *args, **kwargs):
+        super(CursorField, self).__init__(*args, **kwargs)
+        self.page_attribute = page_attribute
+
+    def to_native(self, value):
+        cursor = getattr(value, self.page_attribute)
+        if cursor is None:
+            return None
+        request = self.context.get('request')
+        url = request and request.build_absolute_uri() or ''
+        return replace_query_param(url, self.cursor_field, cursor)
+
+
+class CursorPaginationSerializer(BasePaginationSerializer):
+    """Pagination serializer of cursor pages, which have no count."""
+    next = CursorField('next_cursor', source='*')
+    previous = CursorField('previous_cursor', source='*')
+
+
+def paginate_by_cursor(queryset, ordering, page_size, cursor):
+    """Returns the cursor page of the queryset, raising Http404 if the cursor is not valid."""
+    try:
+        return CursorPaginator(queryset, ordering, page_size).page(cursor)
+    except ValueError:
+        raise Http404(_('Invalid cursor.'))
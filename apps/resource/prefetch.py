@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from django.db.models import FieldDoesNotExist, OneToOneField
+from rest_framework.relations import RelatedField, PrimaryKeyRelatedField
+from rest_framework.serializers import BaseSerializer
+
+
+_related_lookups = {}
+
+
+def get_relation(model, name):
+    """Returns the model related through the field name and whether the relation is to many objects.
+
+    Returns None if the name is not a relation of the model.
+    """
+    try:
+        field, field_model, direct, m2m = model._meta.get_field_by_name(name)
+    except FieldDoesNotExist:
+        return None
+    if direct:
+        if m2m:
+            return field.rel.to, True
+        if getattr(field, 'rel', None):
+            return field.rel.to, False
+        return None
+    if m2m:
+        return field.model, True
+    return field.model, not isinstance(field.field, OneToOneField)
+
+
+def collect_related_lookups(serializer, model, select_related, prefetch_related, prefix='', many=False):
+    """Adds the lookups needed to serialize the model to select_related and prefetch_related.
+
+    Relations used by methods of the serializer can't be found in its fields, so they may be listed in the
+    "select_related" option of its Meta class.
+    """
+    for lookup in getattr(getattr(serializer, 'Meta', None), 'select_related', ()):
+        if many:
+            prefetch_related.add(prefix + lookup)
+        else:
+            select_related.add(prefix + lookup)
+    for field_name, field in serializer.fields.items():
+        source = field.source or field_name
+        if source == '*':
+            continue
+        if isinstance(field, BaseSerializer) or isinstance(field, RelatedField):
+            relation = get_relation(model, source)
+            if relation is None:
+                continue
+            related_model, related_many = relation
+            if isinstance(field, PrimaryKeyRelatedField) and not related_many:
+                # The primary key is read from the foreign key column
+                continue
+            lookup = prefix + source
+            if many or related_many:
+                prefetch_related.add(lookup)
+            else:
+                select_related.add(lookup)
+            if isinstance(field, BaseSerializer):
+                collect_related_lookups(field, related_model, select_related, prefetch_related,
+                                        lookup + '__', many or related_many)
+        else:
+            # Dotted sources, like "category.name", follow each relation of the path
+            lookup = prefix
+            path_many = many
+            path_model = model
+            for name in source.split('.')[:-1]:
+                relation = get_relation(path_model, name)
+                if relation is None:
+                    break
+                path_model, related_many = relation
+                path_many = path_many or related_many
+                lookup += name
+                if path_many:
+                    prefetch_related.add(lookup)
+                else:
+                    select_related.add(lookup)
+                lookup += '__'
+
+
+def get_related_lookups(serializer):
+    """Returns the select_related and prefetch_related lookups needed to serialize objects with the serializer.
+
+    The lookups are found once for each serializer class, model and set of fields, as requests may select or
+    expand fields.
+    """
+    model = getattr(serializer.opts, 'model', None)
+    if model is None:
+        return [], []
+    key = (serializer.__class__, model,
+           tuple((field_name, field.__class__) for field_name, field in serializer.fields.items()))
+    if key not in _related_lookups:
+        select_related = set()
+        prefetch_related = set()
+        collect_related_lookups(serializer, model, select_related, prefetch_related)
+        # Prefetching a lookup also prefetches the lookups it goes through
+        prefetch_related = [lookup for lookup in prefetch_related
+                            if not any(other.startswith(lookup + '__') for other in prefetch_related)]
+        _related_lookups[key] = sorted(select_related), sorted(prefetch_related)
+    return _related_lookups[key]
+
+
+def apply_related_lookups(queryset, serializer):
+    """Applies to the queryset the lookups needed to serialize its objects without a query per object."""
+    select_related, prefetch_related = get_related_lookups(serializer)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import json
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import six
+
+
+class QueryRecorder(CaptureQueriesContext):
+    """Records the SQL queries run on a connection and the time the database took to run them."""
+
+    @property
+    def count(self):
+        return len(self.captured_queries)
+
+    @property
+    def duration(self):
+        """Total database time, in seconds."""
+        return sum(float(query['time']) for query in self.captured_queries)
+
+
+def get_response_view(response):
+    """Returns the REST framework view that built the response, or None if it was built by another view."""
+    renderer_context = getattr(response, 'renderer_context', None) or {}
+    return renderer_context.get('view')
+
+
+def get_view_action(view, method):
+    """Returns the viewset action that handles the request method, like "list" or "partial_update".
+
+    Lists posted to "create" are handled by "bulk_create".
+    """
+    action_map = getattr(view, 'action_map', None) or {}
+    action = action_map.get(method.lower())
+    if action == 'create' and isinstance(getattr(getattr(view, 'request', None), 'DATA', None), list):
+        action = 'bulk_create'
+    return action
+
+
+def get_query_budget(response, method):
+    """Returns the maximum number of queries declared for the view action that built the response, if any.
+
+    The budgets of actions handling many items are pairs of the queries of the request and the queries of each item,
+    and the view counts the items it handled in its "query_budget_items" attribute.
+    """
+    view = get_response_view(response)
+    action = get_view_action(view, method)
+    budget = getattr(view, 'query_budget', {}).get(action)
+    if isinstance(budget, tuple):
+        fixed, per_item = budget
+        budget = fixed + per_item * getattr(view, 'query_budget_items', 0)
+    return budget
+
+
+def get_plan_nodes(plan):
+    """Yields the nodes of a PostgreSQL JSON plan, parents first."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        for node in get_plan_nodes(child):
+            yield node
+
+
+def explain_queryset(queryset):
+    """Returns the plan of the query of the queryset, as lines of text, and the tables it reads sequentially.
+
+    Plans are read on PostgreSQL and SQLite. Other databases return no plan.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    cursor = connection.cursor()
+    try:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, six.string_types):
+                plan = json.loads(plan)
+            nodes = list(get_plan_nodes(plan[0]['Plan']))
+            lines = ['{0} {1}'.format(node['Node Type'], node.get('Relation Name', '')).strip() for node in nodes]
+            scans = [node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan']
+        elif connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            lines = [row[-1] for row in cursor.fetchall()]
+            # "SCAN TABLE name" on older versions, "SCAN name" on newer ones, followed by the index used if any
+            scans = [line.split()[2 if line.startswith('SCAN TABLE ') else 1] for line in lines
+                     if line.startswith('SCAN ') and ' USING ' not in line]
+        else:
+            lines, scans = [], []
+    finally:
+        cursor.close()
+    return lines, scans
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from django.core.urlresolvers import NoReverseMatch, get_script_prefix, get_urlconf
+from django.utils import six
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+
+# Stands for the lookup value in URL templates. Router URLs match lookups with "[^/.]+", so it has no dot or slash.
+URL_PLACEHOLDER = 'urltemplatelookup'
+
+_url_templates = {}
+
+
+def get_url_template(view_name, lookup_kwarg, format=None):
+    """Returns the URL of the view, with URL_PLACEHOLDER in place of the lookup.
+
+    The URL is reversed once for each URL configuration, script prefix, view and format, so it needs no request.
+    """
+    key = (get_urlconf(), get_script_prefix(), view_name, lookup_kwarg, format)
+    if key not in _url_templates:
+        _url_templates[key] = reverse(view_name, kwargs={lookup_kwarg: URL_PLACEHOLDER}, format=format)
+    return _url_templates[key]
+
+
+class TemplatedURLMixin(object):
+    """Builds the hyperlinks of objects by formatting their integer lookups into URL templates.
+
+    Walking the URL resolvers for each link of each object costs more than the rest of the serialization of lists.
+    The links are the same as the ones reverse() returns, as integers need no quoting. Other lookups are reversed.
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        lookup_value = getattr(obj, self.lookup_field, None)
+        if not isinstance(lookup_value, six.integer_types) or isinstance(lookup_value, bool):
+            return super(TemplatedURLMixin, self).get_url(obj, view_name, request, format)
+        try:
+            template = get_url_template(view_name, self.lookup_field, format)
+        except NoReverseMatch:
+            return super(TemplatedURLMixin, self).get_url(obj, view_name, request, format)
+        url = template.replace(URL_PLACEHOLDER, str(lookup_value))
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class HyperlinkedIdentityField(TemplatedURLMixin, serializers.HyperlinkedIdentityField):
+    pass
+
+
+class HyperlinkedRelatedField(TemplatedURLMixin, serializers.HyperlinkedRelatedField):
+    pass
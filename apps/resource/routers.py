@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from rest_framework.routers import DefaultRouter, Route
+
+
+class ResourceRouter(DefaultRouter):
+    """Router that also maps PATCH and DELETE on list URLs to the bulk methods of the viewsets, when they exist.
+
+    The autocomplete, tree and counts URLs of a list are mapped to the methods of the same names of its viewset.
+    """
+    routes = [
+        Route(
+            url=r'^{prefix}{trailing_slash}$',
+            mapping={
+                'get': 'list',
+                'post': 'create',
+                'patch': 'bulk_update',
+                'delete': 'bulk_destroy',
+            },
+            name='{basename}-list',
+            initkwargs={'suffix': 'List'}
+        ),
+        # Mapped only for viewsets with an autocomplete method, before detail URLs would take it for a lookup
+        Route(
+            url=r'^{prefix}/autocomplete{trailing_slash}$',
+            mapping={
+                'get': 'autocomplete',
+            },
+            name='{basename}-autocomplete',
+            initkwargs={'suffix': 'Autocomplete'}
+        ),
+        Route(
+            url=r'^{prefix}/tree{trailing_slash}$',
+            mapping={
+                'get': 'tree',
+            },
+            name='{basename}-tree',
+            initkwargs={'suffix': 'Tree'}
+        ),
+        Route(
+            url=r'^{prefix}/counts{trailing_slash}$',
+            mapping={
+                'get': 'counts',
+            },
+            name='{basename}-counts',
+            initkwargs={'suffix': 'Counts'}
+        ),
+    ] + DefaultRouter.routes[1:]
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+
+# Weights of the fields of a PostgreSQL search vector, from the most relevant field to the least relevant one
+POSTGRESQL_WEIGHTS = 'ABCD'
+
+# Oldest PostgreSQL version with phraseto_tsquery() and ts_filter(), which match phrases and filter fields of vectors
+POSTGRESQL_PHRASE_VERSION = 90600
+
+# Weights of the fields of a SQLite search index, given to bm25()
+SQLITE_WEIGHTS = (10.0, 4.0, 1.0, 0.5)
+
+# Terms between double quotes are phrases, other terms are separated by spaces or commas, as in SearchFilter
+SEARCH_TERMS_PATTERN = re.compile(r'"([^"]*)"|([^\s,"]+)', re.UNICODE)
+
+WORD_PATTERN = re.compile(r'\w', re.UNICODE)
+
+_search_indexes = {}
+
+
+def register_search_index(model, *fields):
+    """Declares a full-text index over text fields of the table of the model, created after each migrate.
+
+    Fields are listed from the most relevant to the least relevant one, up to four. The index is kept by the database,
+    on PostgreSQL as a weighted tsvector column with a GIN index, and on SQLite as a FTS5 table. Triggers update it
+    when the fields of a row are inserted, updated or deleted.
+
+    Phrases are matched on PostgreSQL 9.6 and later. Older servers match the words of phrases in any order, and only
+    search the index over all of its fields.
+    """
+    _search_indexes[model] = tuple(fields[:len(POSTGRESQL_WEIGHTS)])
+
+
+def get_search_index(model):
+    """Returns the model whose table holds the search index of the model, and the indexed fields, or None."""
+    for indexed_model in model.__mro__:
+        if indexed_model in _search_indexes:
+            return indexed_model, _search_indexes[indexed_model]
+    return None
+
+
+def get_search_config():
+    """Returns the text search configuration of PostgreSQL, whose dictionaries stem the language of the site."""
+    return getattr(settings, 'FULL_TEXT_SEARCH_CONFIG', 'simple')
+
+
+def get_search_terms(value):
+    """Returns the terms of a search, as (text, is_phrase) pairs. Terms without any word are dropped."""
+    terms = []
+    for phrase, word in SEARCH_TERMS_PATTERN.findall(value):
+        text = phrase or word
+        if WORD_PATTERN.search(text):
+            terms.append((text, bool(phrase)))
+    return terms
+
+
+def get_sqlite_index_table(model):
+    return '{0}_search'.format(model._meta.db_table)
+
+
+def create_postgresql_index(model, fields, connection):
+    quote_name = connection.ops.quote_name
+    table = model._meta.db_table
+    config = get_search_config()
+    vector = ' || '.join("setweight(to_tsvector('{0}', coalesce(NEW.{1}, '')), '{2}')".format(
+        config, quote_name(model._meta.get_field(name).column), weight)
+        for name, weight in zip(fields, POSTGRESQL_WEIGHTS))
+    columns = ', '.join(quote_name(model._meta.get_field(name).column) for name in fields)
+    function = quote_name('{0}_search_vector'.format(table))
+    cursor = connection.cursor()
+    try:
+        existing = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+        cursor.execute('CREATE OR REPLACE FUNCTION {0}() RETURNS trigger AS $$ BEGIN NEW.search_vector := {1}; '
+                       'RETURN NEW; END $$ LANGUAGE plpgsql'.format(function, vector))
+        cursor.execute('DROP TRIGGER IF EXISTS {0} ON {1}'.format(function, quote_name(table)))
+        cursor.execute('CREATE TRIGGER {0} BEFORE INSERT OR UPDATE OF {1} ON {2} FOR EACH ROW EXECUTE PROCEDURE '
+                       '{0}()'.format(function, columns, quote_name(table)))
+        if 'search_vector' not in existing:
+            cursor.execute('ALTER TABLE {0} ADD COLUMN search_vector tsvector'.format(quote_name(table)))
+            cursor.execute('CREATE INDEX {0} ON {1} USING gin (search_vector)'.format(
+                quote_name('{0}_search_vector_idx'.format(table)), quote_name(table)))
+            # Fills the vectors of the rows saved before the index, through the trigger
+            first_column = quote_name(model._meta.get_field(fields[0]).column)
+            cursor.execute('UPDATE {0} SET {1} = {1}'.format(quote_name(table), first_column))
+    finally:
+        cursor.close()
+
+
+def create_sqlite_index(model, fields, connection):
+    quote_name = connection.ops.quote_name
+    table = model._meta.db_table
+    index_table = get_sqlite_index_table(model)
+    pk = model._meta.pk.column
+    columns = ', '.join(quote_name(model._meta.get_field(name).column) for name in fields)
+    new_values = ', '.join('new.{0}'.format(quote_name(model._meta.get_field(name).column)) for name in fields)
+    old_values = ', '.join('old.{0}'.format(quote_name(model._meta.get_field(name).column)) for name in fields)
+    delete = "INSERT INTO {0}({0}, rowid, {1}) VALUES ('delete', old.{2}, {3});".format(
+        quote_name(index_table), columns, quote_name(pk), old_values)
+    insert = 'INSERT INTO {0}(rowid, {1}) VALUES (new.{2}, {3});'.format(
+        quote_name(index_table), columns, quote_name(pk), new_values)
+    triggers = (
+        ('insert', 'AFTER INSERT', insert),
+        ('delete', 'AFTER DELETE', delete),
+        ('update', 'AFTER UPDATE OF {0}'.format(columns), delete + ' ' + insert),
+    )
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [index_table])
+        exists = cursor.fetchone() is not None
+        # Without a stemmer for the language of the site, accents are removed and words are matched by prefix
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS {0} USING fts5({1}, content='{2}', content_rowid='{3}', "
+                       "tokenize='unicode61 remove_diacritics 2')".format(quote_name(index_table), columns, table, pk))
+        for name, event, statements in triggers:
+            cursor.execute('CREATE TRIGGER IF NOT EXISTS {0} {1} ON {2} BEGIN {3} END'.format(
+                quote_name('{0}_{1}'.format(index_table, name)), event, quote_name(table), statements))
+        if not exists:
+            cursor.execute("INSERT INTO {0}({0}) VALUES ('rebuild')".format(quote_name(index_table)))
+    finally:
+        cursor.close()
+
+
+def create_search_indexes(models, using):
+    connection = connections[using]
+    for model in models:
+        if connection.vendor == 'postgresql':
+            create_postgresql_index(model, _search_indexes[model], connection)
+        elif connection.vendor == 'sqlite':
+            create_sqlite_index(model, _search_indexes[model], connection)
+
+
+@receiver(post_migrate)
+def create_registered_search_indexes(sender, using, **kwargs):
+    create_search_indexes([model for model in _search_indexes if model._meta.app_config is sender], using)
+
+
+def can_search(queryset, fields):
+    """Returns whether the fields of the queryset model can be searched in a full-text index on its database."""
+    search_index = get_search_index(queryset.model)
+    if search_index is None or not set(fields) <= set(search_index[1]):
+        return False
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        # Some of the fields are searched by filtering the others out of the vectors
+        return set(fields) == set(search_index[1]) or connection.pg_version >= POSTGRESQL_PHRASE_VERSION
+    return connection.vendor == 'sqlite'
+
+
+def search_queryset(queryset, terms, fields):
+    """Filters the queryset by the objects whose fields hold all the search terms, selecting the relevance of each
+    object as its "search_rank".
+
+    Phrases match words in sequence, except on PostgreSQL before 9.6. The queryset must be searchable by the fields.
+    """
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    indexed_model, indexed_fields = get_search_index(queryset.model)
+    table = quote_name(indexed_model._meta.db_table)
+    pk = '{0}.{1}'.format(table, quote_name(indexed_model._meta.pk.column))
+    if connection.vendor == 'postgresql':
+        config = get_search_config()
+        phrase_query = 'phraseto_tsquery' if connection.pg_version >= POSTGRESQL_PHRASE_VERSION else 'plainto_tsquery'
+        query = ' && '.join('{0}(%s::regconfig, %s)'.format(phrase_query if phrase else 'plainto_tsquery')
+                            for text, phrase in terms)
+        query_params = [param for text, phrase in terms for param in (config, text)]
+        vector = '{0}.search_vector'.format(table)
+        # The GIN index finds the rows holding the terms in any field
+        where = ['{0} @@ ({1})'.format(vector, query)]
+        params = list(query_params)
+        rank_params = list(query_params)
+        if set(fields) != set(indexed_fields):
+            # Then the words of the other fields are filtered out of the vectors of these rows
+            weights = '{{{0}}}'.format(','.join(
+                weight.lower() for name, weight in zip(indexed_fields, POSTGRESQL_WEIGHTS) if name in fields))
+            vector = 'ts_filter({0}, %s::"char"[])'.format(vector)
+            where.append('{0} @@ ({1})'.format(vector, query))
+            params += [weights] + query_params
+            rank_params = [weights] + query_params
+        rank = 'ts_rank({0}, ({1}))'.format(vector, query)
+    else:
+        index_table = quote_name(get_sqlite_index_table(indexed_model))
+        columns = ' '.join(indexed_model._meta.get_field(name).column for name in indexed_fields if name in fields)
+        expression = ' AND '.join(
+            u'"{0}"{1}'.format(text.replace('"', '""'), '' if phrase else ' *') for text, phrase in terms)
+        params = rank_params = [u'{{{0}}} : ({1})'.format(columns, expression)]
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS[:len(indexed_fields)])
+        where = ['{0} IN (SELECT rowid FROM {1} WHERE {1} MATCH %s)'.format(pk, index_table)]
+        rank = '(SELECT -bm25({0}, {1}) FROM {0} WHERE {0} MATCH %s AND rowid = {2})'.format(index_table, weights, pk)
+    return queryset.extra(select={'search_rank': rank}, select_params=rank_params, where=where, params=params)
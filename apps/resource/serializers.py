@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
+import copy
+
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.models import Group as AuthGroup, User as AuthUser, Permission
+from django.contrib.sites.models import Site as ContribSite
 from rest_framework import serializers
 
+from apps.resource.context import get_tenant_context
 from apps.resource.models import Resource, Group, User, AuthorRestriction
+from apps.resource.relations import HyperlinkedIdentityField, HyperlinkedRelatedField
+
+
+_default_fields = {}
 
 
 class PermissionSerializer(serializers.ModelSerializer):
@@ -36,27 +44,92 @@ class AuthGroupSerializer(serializers.ModelSerializer):
         fields = ('id', 'permissions')
 
 
+class NestedSiteSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ContribSite
+        fields = ('id', 'domain', 'name')
+
+
 class ResourceSerializer(serializers.HyperlinkedModelSerializer):
+    """Serializer of resources, which may render just some of its fields, or expand some relations.
+
+    The fields argument lists the names of the fields to render. The expand argument lists relations to render as
+    nested objects, as set in the "expandable_fields" option of the Meta class. Model columns needed by no rendered
+    field are listed in deferred_fields, so they are not read.
+    """
+    _hyperlink_field_class = HyperlinkedRelatedField
+    _hyperlink_identify_field_class = HyperlinkedIdentityField
     author = NestedAuthUserSerializer(read_only=True)
     owner = NestedAuthUserSerializer(read_only=True)
     sites = serializers.PrimaryKeyRelatedField(many=True, required=False)
 
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super(ResourceSerializer, self).__init__(*args, **kwargs)
+        self.deferred_fields = []
+        if expand:
+            self.expand_fields(expand)
+        if fields:
+            self.select_fields(fields)
+
+    def expand_fields(self, names):
+        expandable_fields = getattr(self.Meta, 'expandable_fields', {})
+        for name in names:
+            if name in self.fields and name in expandable_fields:
+                field = self.fields[name]
+                nested = expandable_fields[name](source=field.source, many=getattr(field, 'many', False),
+                                                 read_only=True, context=self.context)
+                nested.initialize(parent=self, field_name=name)
+                self.fields[name] = nested
+
+    def select_fields(self, names):
+        """Removes the fields not named, and lists the columns only they needed in deferred_fields."""
+        removed_sources = set()
+        needed_sources = set()
+        field_dependencies = getattr(self.Meta, 'field_dependencies', {})
+        for name, field in list(self.fields.items()):
+            source = (field.source or name).split('.')[0]
+            if name in names:
+                needed_sources.add(source)
+                needed_sources.update(field_dependencies.get(name, ()))
+            else:
+                removed_sources.add(source)
+                del self.fields[name]
+        # The modification date validates the responses
+        needed_sources.add('last_modification_date')
+        unneeded_sources = removed_sources - needed_sources
+        self.deferred_fields = [field.name for field in self.opts.model._meta.concrete_fields
+                                if not field.rel and not field.primary_key and field.name in unneeded_sources]
+
+    def get_default_fields(self):
+        """Returns copies of the fields built from the model, which are built once for each serializer class.
+
+        Querysets depending on the request are still bound by get_fields on each serializer.
+        """
+        key = self.__class__
+        if key not in _default_fields:
+            _default_fields[key] = super(ResourceSerializer, self).get_default_fields()
+        return copy.deepcopy(_default_fields[key])
+
     def get_fields(self):
         fields = super(ResourceSerializer, self).get_fields()
         fields['sites'].queryset = fields['sites'].queryset.filter(
-            site__owner=self.context['request'].user.user.owner)
+            site__owner=get_tenant_context(self.context['request']).owner_id)
         return fields
 
     class Meta:
         model = Resource
+        expandable_fields = {'sites': NestedSiteSerializer}
 
 
 class GroupSerializer(ResourceSerializer):
     group = AuthGroupSerializer(read_only=True)
-    assign_permissions = serializers.HyperlinkedIdentityField(label=_('assign permissions'),
-                                                              view_name='group-assign-permissions')
-    unassign_permissions = serializers.HyperlinkedIdentityField(label=_('unassign permissions'),
-                                                                view_name='group-unassign-permissions')
+    assign_permissions = HyperlinkedIdentityField(label=_('assign permissions'),
+                                                  view_name='group-assign-permissions')
+    unassign_permissions = HyperlinkedIdentityField(label=_('unassign permissions'),
+                                                    view_name='group-unassign-permissions')
 
     class Meta(ResourceSerializer.Meta):
         model = Group
@@ -64,12 +137,12 @@ class GroupSerializer(ResourceSerializer):
 
 class UserSerializer(ResourceSerializer):
     user = AuthUserSerializer()
-    assign_groups = serializers.HyperlinkedIdentityField(label=_('assign groups'), view_name='user-assign-groups')
-    unassign_groups = serializers.HyperlinkedIdentityField(label=_('unassign groups'), view_name='user-unassign-groups')
-    assign_permissions = serializers.HyperlinkedIdentityField(label=_('assign permissions'),
-                                                              view_name='user-assign-permissions')
-    unassign_permissions = serializers.HyperlinkedIdentityField(label=_('unassign permissions'),
-                                                                view_name='user-unassign-permissions')
+    assign_groups = HyperlinkedIdentityField(label=_('assign groups'), view_name='user-assign-groups')
+    unassign_groups = HyperlinkedIdentityField(label=_('unassign groups'), view_name='user-unassign-groups')
+    assign_permissions = HyperlinkedIdentityField(label=_('assign permissions'),
+                                                  view_name='user-assign-permissions')
+    unassign_permissions = HyperlinkedIdentityField(label=_('unassign permissions'),
+                                                    view_name='user-unassign-permissions')
 
     class Meta(ResourceSerializer.Meta):
         model = User
@@ -82,10 +155,9 @@ class AuthorRestrictionSerializer(ResourceSerializer):
 
     def get_fields(self):
         fields = super(AuthorRestrictionSerializer, self).get_fields()
-        fields['user'].queryset = fields['user'].queryset.filter(
-            user__owner=self.context['request'].user.user.owner)
-        fields['group'].queryset = fields['group'].queryset.filter(
-            group__owner=self.context['request'].user.user.owner)
+        owner_id = get_tenant_context(self.context['request']).owner_id
+        fields['user'].queryset = fields['user'].queryset.filter(user__owner=owner_id)
+        fields['group'].queryset = fields['group'].queryset.filter(group__owner=owner_id)
         queryset = fields['permission'].queryset
         queryset = queryset.exclude(content_type__app_label__in=['admin', 'auth', 'contenttypes', 'oauth2_provider',
                                                                  'sessions', 'sites'])
@@ -93,4 +165,5 @@ class AuthorRestrictionSerializer(ResourceSerializer):
         return fields
 
     class Meta(ResourceSerializer.Meta):
-        model = AuthorRestriction
\ No newline at end of file
+        model = AuthorRestriction
+        exclude = ('authors',)
\ No newline at end of file
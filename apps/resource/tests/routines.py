@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group as AuthGroup, User
 from django.contrib.sites.models import Site as ContribSite
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
 from apps.resource.models import Resource, Site
 from test_routines import (
+    request_within_budget,
     test_serializer_hyperlinked_fields_routine,
     test_serializer_read_only_fields_routine,
 )
@@ -57,4 +60,242 @@ def test_resource_sites_field_routine(test_case):
     test_case.set_authorization_bearer(test_case.second_owner_token)
     test_case.data.update({'email': 'sites@sites.com'})
     response6 = test_case.client.post(test_case.url, test_case.data)
-    test_case.assertEqual(status.HTTP_400_BAD_REQUEST, response6.status_code, response6.data)
\ No newline at end of file
+    test_case.assertEqual(status.HTTP_400_BAD_REQUEST, response6.status_code, response6.data)
+
+
+def test_resource_site_write_queries_routine(test_case):
+    site_id = ContribSite.objects.get(domain='testserver').id
+    test_case.assertEqual([site_id], test_case.first_object_response.data['sites'])
+    # The first write outside a transaction caches the site and its registration
+    response = test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual([site_id], response.data['sites'])
+    with CaptureQueriesContext(connection) as context:
+        response2 = test_case.client.post(test_case.url, test_case.altered_data)
+        response3 = test_case.client.put(test_case.first_object_response.data['url'], test_case.altered_data)
+    test_case.assertEqual([site_id], response2.data['sites'])
+    test_case.assertEqual([site_id], response3.data['sites'])
+    for query in context.captured_queries:
+        test_case.assertNotIn('"django_site"."domain" =', query['sql'], 'The site of the request is not cached')
+        test_case.assertNotIn('FROM "resource_site"', query['sql'], 'The site registration is not cached')
+
+
+def test_resource_bulk_methods_routine(test_case):
+    response = request_within_budget(test_case, 'post', test_case.url, [test_case.data, test_case.altered_data])
+    test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    test_case.assertEqual(2, len(response.data))
+    site_id = ContribSite.objects.get(domain='testserver').id
+    for item in response.data:
+        test_case.assertEqual([site_id], item['sites'])
+    test_case.assertEqual(3, test_case.client.get(test_case.url).data['count'])
+
+    urls = [item['url'] for item in response.data]
+    items = [dict(test_case.altered_data, url=url) for url in urls]
+    response2 = request_within_budget(test_case, 'patch', test_case.url, items)
+    test_case.assertEqual(status.HTTP_200_OK, response2.status_code, response2.data)
+    test_case.assertEqual(urls, [item['url'] for item in response2.data])
+
+    test_case.set_authorization_bearer(test_case.second_owner_token)
+    response3 = test_case.client.patch(test_case.url, items)
+    test_case.assertEqual(status.HTTP_400_BAD_REQUEST, response3.status_code, response3.data)
+    response4 = test_case.client.delete(test_case.url, urls)
+    test_case.assertEqual(status.HTTP_404_NOT_FOUND, response4.status_code, response4.data)
+
+    test_case.set_authorization_bearer()
+    response5 = test_case.client.delete(test_case.url, urls + ['not an url'])
+    test_case.assertEqual(status.HTTP_404_NOT_FOUND, response5.status_code, response5.data)
+    test_case.assertEqual(['not an url'], response5.data['items'])
+    response6 = request_within_budget(test_case, 'delete', test_case.url, urls)
+    test_case.assertEqual(status.HTTP_204_NO_CONTENT, response6.status_code)
+    test_case.assertEqual(1, test_case.client.get(test_case.url).data['count'])
+
+
+def test_resource_list_queries_routine(test_case, data_list=None):
+    if data_list is None:
+        data_list = [test_case.data] * 3
+    for data in data_list:
+        response = test_case.client.post(test_case.url, data)
+        test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    # Fills the caches of the request tenant before counting
+    test_case.client.get(test_case.url)
+    query_counts = []
+    for page_size in (1, len(data_list)):
+        with CaptureQueriesContext(connection) as context:
+            response = test_case.client.get(test_case.url, {'page_size': page_size})
+        test_case.assertEqual(page_size, len(response.data['results']))
+        query_counts.append(len(context.captured_queries))
+    test_case.assertEqual(query_counts[0], query_counts[1], 'The number of queries depends on the page size')
+
+
+def test_resource_cursor_pagination_routine(test_case, data_list=None):
+    if data_list is None:
+        data_list = [test_case.data] * 4
+    for data in data_list:
+        response = test_case.client.post(test_case.url, data)
+        test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    numbered_urls = [obj['url'] for obj in test_case.client.get(test_case.url, {'page_size': 100}).data['results']]
+
+    response = test_case.client.get(test_case.url, {'cursor': '', 'page_size': 2})
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+    test_case.assertNotIn('count', response.data)
+    test_case.assertIsNone(response.data['previous'])
+    pages = [[obj['url'] for obj in response.data['results']]]
+    while response.data['next']:
+        response = test_case.client.get(response.data['next'])
+        test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+        pages.append([obj['url'] for obj in response.data['results']])
+    cursor_urls = [url for page in pages for url in page]
+    test_case.assertEqual(sorted(numbered_urls), sorted(cursor_urls))
+    test_case.assertEqual(len(set(cursor_urls)), len(cursor_urls))
+
+    # Going back from the last page returns the same pages
+    for page in reversed(pages[:-1]):
+        response = test_case.client.get(response.data['previous'])
+        test_case.assertEqual(page, [obj['url'] for obj in response.data['results']])
+    test_case.assertIsNone(response.data['previous'])
+
+    response = test_case.client.get(test_case.url, {'cursor': 'invalid'})
+    test_case.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
+def test_resource_list_count_cache_routine(test_case):
+    response = test_case.client.get(test_case.url)
+    count = response.data['count']
+    test_case.assertTrue(response.data['count_exact'])
+    with CaptureQueriesContext(connection) as context:
+        response = test_case.client.get(test_case.url)
+    test_case.assertEqual(count, response.data['count'])
+    count_queries = [query['sql'] for query in context.captured_queries if 'COUNT(' in query['sql']]
+    test_case.assertEqual([], count_queries, 'The count of the list was not cached')
+
+    response = test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    test_case.assertEqual(count + 1, test_case.client.get(test_case.url).data['count'])
+    test_case.client.delete(response.data['url'])
+    test_case.assertEqual(count, test_case.client.get(test_case.url).data['count'])
+
+
+def test_resource_conditional_get_routine(test_case):
+    object_url = test_case.first_object_response.data['url']
+    for url in (object_url, test_case.url):
+        response = test_case.client.get(url)
+        etag = response['ETag']
+        test_case.assertTrue(etag.startswith('W/"'))
+        response = test_case.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        test_case.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        test_case.assertEqual(b'', response.content)
+        response = test_case.client.get(url, HTTP_IF_NONE_MATCH='W/"other"')
+        test_case.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    response = test_case.client.get(object_url)
+    response = test_case.client.get(object_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    test_case.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+    # Deletions do not move the latest modification date of lists, so they are only validated by their ETags
+    response = test_case.client.get(test_case.url)
+    test_case.assertNotIn('Last-Modified', response)
+    response = test_case.client.get(test_case.url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    object_etag = test_case.client.get(object_url)['ETag']
+    list_etag = test_case.client.get(test_case.url)['ETag']
+    response = test_case.client.patch(object_url, {})
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+    test_case.assertEqual(status.HTTP_200_OK,
+                          test_case.client.get(object_url, HTTP_IF_NONE_MATCH=object_etag).status_code)
+    list_response = test_case.client.get(test_case.url, HTTP_IF_NONE_MATCH=list_etag)
+    test_case.assertEqual(status.HTTP_200_OK, list_response.status_code)
+    test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual(status.HTTP_200_OK,
+                          test_case.client.get(test_case.url, HTTP_IF_NONE_MATCH=list_response['ETag']).status_code)
+
+
+def test_resource_response_cache_routine(test_case):
+    object_url = test_case.first_object_response.data['url']
+    table = test_case.model._meta.db_table
+    for url in (test_case.url, object_url):
+        response = test_case.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            cached_response = test_case.client.get(url)
+        test_case.assertEqual(response.data, cached_response.data)
+        test_case.assertEqual(response['ETag'], cached_response['ETag'])
+        model_queries = [query['sql'] for query in context.captured_queries if '"{0}"'.format(table) in query['sql']]
+        test_case.assertEqual([], model_queries, 'The response was not cached')
+
+    # Changes to the objects of the owner drop the cached responses
+    response = test_case.client.patch(object_url, test_case.altered_data)
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+    test_case.assertEqual(response.data, test_case.client.get(object_url).data)
+    count = test_case.client.get(test_case.url).data['count']
+    test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual(count + 1, test_case.client.get(test_case.url).data['count'])
+
+    # Changes to the sites of the objects and to the groups of users drop the cached responses
+    for change in (lambda: Resource.objects.get(pk=object_url.split('/')[-2]).sites.clear(),
+                   lambda: test_case.owner.groups.add(AuthGroup.objects.create(name='Response cache group'))):
+        test_case.client.get(test_case.url)
+        change()
+        with CaptureQueriesContext(connection) as context:
+            test_case.client.get(test_case.url)
+        model_queries = [query['sql'] for query in context.captured_queries if '"{0}"'.format(table) in query['sql']]
+        test_case.assertNotEqual([], model_queries, 'The cached response was not dropped')
+
+    # Other users of the same owner do not get the cached responses
+    test_case.set_authorization_bearer(test_case.account_user_token)
+    test_case.assertNotEqual(count + 1, test_case.client.get(test_case.url).data.get('count'))
+
+
+def test_resource_sparse_fields_routine(test_case, deferred_field, expand=('sites',)):
+    main_site, created = ContribSite.objects.get_or_create(domain='testserver')
+    Site.objects.get_or_create(site=main_site, owner=test_case.owner, author=test_case.owner)
+    test_case.data.update({'sites': [main_site.id]})
+    response = test_case.client.post(test_case.url, test_case.data)
+    test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    object_url = response.data['url']
+
+    # Only the fields asked for are rendered, and the columns no rendered field needs are not read
+    column = '"{0}"."{1}"'.format(test_case.model._meta.get_field(deferred_field).model._meta.db_table,
+                                  test_case.model._meta.get_field(deferred_field).column)
+    for url in (object_url, test_case.url):
+        with CaptureQueriesContext(connection) as context:
+            sparse_response = test_case.client.get(url, {'fields': 'url,sites'})
+        test_case.assertEqual(status.HTTP_200_OK, sparse_response.status_code, sparse_response.data)
+        data = sparse_response.data['results'][0] if 'results' in sparse_response.data else sparse_response.data
+        test_case.assertEqual(['sites', 'url'], sorted(data.keys()))
+        test_case.assertFalse([query['sql'] for query in context.captured_queries if column in query['sql']],
+                              'The column of a field not rendered was read')
+
+    # Expanded relations are rendered as nested objects
+    response = test_case.client.get(object_url, {'expand': ','.join(expand)})
+    test_case.assertEqual({'id': main_site.id, 'domain': main_site.domain, 'name': main_site.name},
+                          response.data['sites'][0])
+    for name in expand:
+        test_case.assertTrue(all(isinstance(value, dict) for value in response.data[name]))
+    response = test_case.client.get(test_case.url, {'expand': 'sites', 'fields': 'sites'})
+    test_case.assertIn({'sites': [{'id': main_site.id, 'domain': main_site.domain, 'name': main_site.name}]},
+                       [dict(item) for item in response.data['results']])
+
+    # Writes render every field
+    response = test_case.client.patch('{0}?fields=url'.format(object_url), test_case.altered_data)
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
+    test_case.assertIn('owner', response.data)
+
+
+def test_resource_autocomplete_routine(test_case, field, labels, prefix='zeta'):
+    for label in labels:
+        response = test_case.client.post(test_case.url, dict(test_case.data, **{field: label}))
+        test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
+    autocomplete_url = test_case.url + 'autocomplete/'
+    expected = sorted([label for label in labels if label.lower().startswith(prefix)], key=lambda label: label.lower())
+
+    response = request_within_budget(test_case, 'get', autocomplete_url, {'q': prefix.upper()})
+    test_case.assertEqual(status.HTTP_200_OK, response.status_code)
+    test_case.assertEqual(expected, [item['label'] for item in response.data])
+    test_case.assertEqual(set(['id', 'label']), set(response.data[0].keys()))
+    test_case.assertEqual(response.data[0]['id'], test_case.model.objects.get(**{field: expected[0]}).id)
+
+    response = test_case.client.get(autocomplete_url, {'q': prefix, 'limit': 1})
+    test_case.assertEqual(expected[:1], [item['label'] for item in response.data])
+    test_case.assertEqual([], test_case.client.get(autocomplete_url, {'q': ' '}).data)
+
+    # Objects of other owners are never suggested
+    test_case.set_authorization_bearer(test_case.second_owner_token)
+    test_case.assertEqual([], test_case.client.get(autocomplete_url, {'q': prefix}).data)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import random
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.utils.six import StringIO
 from django.contrib.auth.models import Permission
 from django.http.request import HttpRequest
 from django.test import LiveServerTestCase
@@ -38,6 +40,17 @@ class AuthorRestrictionTestCase(LiveServerTestCase):
         author_rest.delete()
         self.assertNotIn(self.perm, group.group.permissions.all())
 
+    def test_model_authors_relation(self):
+        other_user = AuthUser.objects.create_user(username='other_user', password='123')
+        self.assertEqual([self.user], list(self.author_restriction.authors.all()))
+        self.author_restriction.filter_values = '{0}, {1},999999,'.format(self.user.id, other_user.id)
+        self.author_restriction.save()
+        self.assertEqual([self.user, other_user], list(self.author_restriction.authors.order_by('id')))
+
+        AuthorRestriction.authors.through.objects.all().delete()
+        call_command('sync_author_restrictions', stdout=StringIO())
+        self.assertEqual([self.user, other_user], list(self.author_restriction.authors.order_by('id')))
+
     def test_serializer_get_fields_method(self):
         request = HttpRequest()
 
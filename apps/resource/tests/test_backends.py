@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
+from django.core.cache import cache
 from django.test import LiveServerTestCase
 from django.http import HttpRequest
-from apps.resource.models import AuthUser, User, Site, ContribSite, AuthorRestriction, Permission
+from apps.resource.models import AuthUser, User, Group, Site, ContribSite, AuthorRestriction, Permission
+from apps.resource.cache import LRUCache, atomic_write, response_key
+from apps.resource.context import get_tenant_context
 from apps.resource.backends import SiteDomainFilterBackend, AuthorRestrictionBackend, ResourceFilterBackend, \
     custom_permissions_map
 from apps.news.models import News
@@ -42,6 +45,47 @@ class BackendsTestCase(LiveServerTestCase):
         self.assertEqual(list(News.objects.filter(sites__domain='otherserver')),
                          list(backend.filter_queryset(self.request, self.news_queryset, view=None)))
 
+    def test_site_domain_filter_backend_cache(self):
+        self.request.META['HTTP_HOST'] = 'newserver'
+        backend = SiteDomainFilterBackend()
+        self.assertEqual(0, backend.filter_queryset(self.request, self.news_queryset, view=None).count())
+        # Sites created by other processes do not invalidate the cache of this one, so unknown domains are not cached
+        ContribSite.objects.bulk_create([ContribSite(domain='newserver')])
+        site = ContribSite.objects.get(domain='newserver')
+        News.objects.get().sites.add(site)
+        self.request = HttpRequest()
+        self.request.user = self.user
+        self.request.META['HTTP_HOST'] = 'newserver'
+        self.assertEqual(1, backend.filter_queryset(self.request, self.news_queryset, view=None).count())
+        site.domain = 'renamedserver'
+        site.save()
+        self.request = HttpRequest()
+        self.request.user = self.user
+        self.request.META['HTTP_HOST'] = 'newserver'
+        self.assertEqual(0, backend.filter_queryset(self.request, self.news_queryset, view=None).count())
+
+    def test_lru_cache(self):
+        lru_cache = LRUCache(2, 60)
+        lru_cache.set('a', 1)
+        lru_cache.set('b', 2)
+        self.assertEqual(1, lru_cache.get('a'))
+        lru_cache.set('c', 3)
+        self.assertIsNone(lru_cache.get('b'))
+        self.assertEqual(1, lru_cache.get('a'))
+        self.assertEqual(3, lru_cache.get('c'))
+        lru_cache.timeout = -1
+        lru_cache.set('a', 1)
+        self.assertEqual('expired', lru_cache.get('a', 'expired'))
+        lru_cache.clear()
+        self.assertIsNone(lru_cache.get('c'))
+
+    def test_cache_invalidated_after_atomic_write(self):
+        with atomic_write():
+            self.news_queryset.get().save()
+            # Another connection reads the news before the write is committed, and caches them under the new version
+            cache.set(response_key(self.user.pk, 'fingerprint'), 'stale')
+        self.assertIsNone(cache.get(response_key(self.user.pk, 'fingerprint')))
+
     def test_resource_filter_backend(self):
         backend = ResourceFilterBackend()
         self.assertEqual(1, backend.filter_queryset(self.request, self.news_queryset, view=None).count())
@@ -75,6 +119,46 @@ class BackendsTestCase(LiveServerTestCase):
         queryset = backend.filter_queryset(self.request, self.news_queryset, view=NewsViewSet)
         self.assertEqual(1, queryset.count())
 
+    def test_author_restriction_backend_cache(self):
+        self.request.method = 'GET'
+        perm = Permission.objects.filter(codename__endswith='news').all()[3]
+        self.user.user_permissions.add(perm)
+        group = Group.objects.create(owner=self.user, author=self.user, role='restricted')
+        AuthorRestriction.objects.create(owner=self.user, author=self.user, group=group.group, permission=perm,
+                                         filter_values=self.user.id + 1)
+        self.request.user = AuthUser.objects.get(id=self.user.id)
+        backend = AuthorRestrictionBackend()
+        self.assertEqual(1, backend.filter_queryset(self.request, self.news_queryset, view=NewsViewSet).count())
+        with self.assertNumQueries(0):
+            backend.filter_queryset(self.request, self.news_queryset, view=NewsViewSet)
+
+        self.user.groups.add(group.group)
+        queryset = backend.filter_queryset(self.request, self.news_queryset, view=NewsViewSet)
+        self.assertEqual(0, queryset.count())
+        self.user.groups.remove(group.group)
+        queryset = backend.filter_queryset(self.request, self.news_queryset, view=NewsViewSet)
+        self.assertEqual(1, queryset.count())
+
+    def test_tenant_context(self):
+        self.request.META['HTTP_HOST'] = 'testserver'
+        site_id = ContribSite.objects.get(domain='testserver').id
+        context = get_tenant_context(self.request)
+        with self.assertNumQueries(4):
+            self.assertEqual(self.user.id, context.owner_id)
+            self.assertEqual(site_id, context.site_id)
+            self.assertFalse(context.has_perm('news.view_news'))
+        with self.assertNumQueries(0):
+            self.assertIs(context, get_tenant_context(self.request))
+            ResourceFilterBackend().filter_queryset(self.request, self.news_queryset, view=None)
+            SiteDomainFilterBackend().filter_queryset(self.request, self.news_queryset, view=None)
+
+        self.request.META['HTTP_HOST'] = 'otherserver'
+        self.assertIsNot(context, get_tenant_context(self.request))
+        self.assertIsNone(get_tenant_context(self.request).site_id)
+        other_user = AuthUser.objects.create_user(username='other_user', password='123')
+        self.request.user = other_user
+        self.assertIs(other_user, get_tenant_context(self.request).user)
+
     def test_custom_permissions_map(self):
         custom_perms_map = {}
 
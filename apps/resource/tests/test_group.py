@@ -12,7 +12,9 @@ from apps.resource.serializers import AuthGroupSerializer
 from apps.resource.views import GroupViewSet
 from apps.resource.exceptions import BadRequestValidationError
 from test_fixtures import user_accountuser_account_permissions_token_fixture
+from apps.resource.tests import routines
 import test_routines
+from test_routines import request_within_budget
 
 
 class GroupTestCase(LiveServerTestCase):
@@ -85,6 +87,9 @@ class GroupAPITestCase(APILiveServerTestCase):
         else:
             self.altered_data.update({'role': 'Group {0}'.format(random.randint(1, 100000))})
 
+    def test_list_queries(self):
+        routines.test_resource_list_queries_routine(self, [{'role': 'Group {0}'.format(i)} for i in range(3)])
+
     def test_create(self):
         self.alter_data()
         response = self.client.post(self.url, self.data)
@@ -154,7 +159,7 @@ class GroupAPITestCase(APILiveServerTestCase):
         response = self.client.post(assign_perms_url, data={'perms': permission_list})
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code, response.data)
 
-        response = self.client.post(assign_perms_url, data={'permissions': permission_list})
+        response = request_within_budget(self, 'post', assign_perms_url, {'permissions': permission_list})
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         self.assertEqual(permission_list, response.data['assigned_permissions'], response.data)
 
@@ -172,11 +177,11 @@ class GroupAPITestCase(APILiveServerTestCase):
         response = self.client.post(unassign_perms_url, data={'perms': permission_list})
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code, response.data)
 
-        response = self.client.post(unassign_perms_url, data={'permissions': permission_list})
+        response = request_within_budget(self, 'post', unassign_perms_url, {'permissions': permission_list})
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         self.assertEqual([], list(group.group.permissions.all()))
 
         permission_list.append(1273817)
-        response = self.client.post(assign_perms_url, data={'permissions': permission_list})
+        response = request_within_budget(self, 'post', assign_perms_url, {'permissions': permission_list})
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         self.assertEqual(list(permission_queryset), list(group.group.permissions.all()))
\ No newline at end of file
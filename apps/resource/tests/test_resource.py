@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 from django.test.testcases import TestCase
 from django.http.request import HttpRequest
+from rest_framework.reverse import reverse
 
+from apps.resource.indexes import create_registered_indexes, get_missing_indexes
+from apps.resource.relations import HyperlinkedIdentityField
 from apps.resource.serializers import ResourceSerializer
 from apps.resource.models import Site, Resource, ContribSite, AuthUser, User
 from apps.resource.views import ResourceViewSet
-from test_fixtures import user_accountuser_account_permissions_token_fixture
+from apps.category.models import Category
+from apps.news.models import News
+from apps.newsletter.models import Submission
+from apps.publication.models import Publication
+from test_fixtures import user_accountuser_account_permissions_token_fixture, scaled_fixture
 
 
 class ResourceTestCase(TestCase):
@@ -49,3 +56,71 @@ class ResourceTestCase(TestCase):
         viewset.post_save(resource)
         site = ContribSite.objects.get(domain='testserver')
         self.assertIn(site, resource.sites.all())
+
+    def test_scaled_fixture(self):
+        fixture = scaled_fixture(self, owners=2, users=2, sites=2, categories=6, category_depth=3, publications=4,
+                                 pages=1, subscriptions=3, restrictions=2)
+        self.assertEqual(2, len(self.tokens))
+        self.assertEqual(2 * 4, News.objects.count())
+        self.assertEqual(2 * 2, Category.objects.filter(level=2).count())
+        for token in self.tokens:
+            response = self.client.get('/news/', HTTP_AUTHORIZATION='Bearer {0}'.format(token),
+                                       HTTP_HOST=fixture.domains[token][0])
+            self.assertEqual(200, response.status_code)
+            for news in response.data['results']:
+                self.assertEqual(fixture.owner_ids[token], news['owner']['id'])
+
+    def test_templated_hyperlinks(self):
+        user = AuthUser.objects.create_user(username='user', password='123')
+        resource = User.objects.create(owner=user, author=user, user=user)
+        request = HttpRequest()
+        request.META.update({'SERVER_NAME': 'testserver', 'SERVER_PORT': '80'})
+        for view_name in ('user-detail', 'user-assign-groups', 'user-unassign-permissions'):
+            for format in (None, 'json'):
+                field = HyperlinkedIdentityField(view_name=view_name)
+                field.context = {'request': request, 'format': format}
+                self.assertEqual(reverse(view_name, kwargs={'pk': resource.pk}, request=request, format=format),
+                                 field.field_to_native(resource, 'url'))
+                # Serializers require a request, but relative links are still built without one
+                self.assertEqual(reverse(view_name, kwargs={'pk': resource.pk}, format=format),
+                                 field.get_url(resource, view_name, None, format))
+
+    def test_default_fields_are_copied(self):
+        user = AuthUser.objects.create_user(username='user', password='123')
+        User.objects.create(owner=user, author=user, user=user)
+        request = HttpRequest()
+        request.user = user
+        first = ResourceSerializer(context={'request': request})
+        second = ResourceSerializer(context={'request': request})
+        self.assertEqual(list(first.fields.keys()), list(second.fields.keys()))
+        for name, field in first.fields.items():
+            self.assertIsNot(field, second.fields[name])
+            self.assertIs(second, second.fields[name].parent)
+
+    def test_composite_indexes(self):
+        for model in (Resource, Resource.sites.through, Publication, Submission):
+            self.assertEqual([], get_missing_indexes(model, 'default'))
+        # Indexes are only created once, as migrations run again
+        create_registered_indexes(sender=Resource._meta.app_config, using='default')
+
+    def test_changed_fields(self):
+        user = AuthUser.objects.create_user(username='user', password='123')
+        news = News(owner=user, author=user, title='Title', content='Content')
+        self.assertTrue(news.has_changed('title'))
+        news.save()
+        self.assertFalse(news.has_changed('title'))
+        self.assertEqual([], news.get_changed_fields())
+        news = News.objects.get(pk=news.pk)
+        self.assertEqual([], news.get_changed_fields())
+        news.title = 'Other title'
+        news.author = AuthUser.objects.create_user(username='author', password='123')
+        self.assertTrue(news.has_changed('title'))
+        self.assertTrue(news.has_changed('author'))
+        self.assertFalse(news.has_changed('content'))
+        self.assertEqual(['author', 'title'], sorted(news.get_changed_fields()))
+        with self.assertNumQueries(2):
+            # The resource and publication tables are updated, the news table holds no changed field
+            news.save()
+        self.assertEqual([], news.get_changed_fields())
+        news = News.objects.get(pk=news.pk)
+        self.assertEqual(('Other title', 'Content'), (news.title, news.content))
@@ -8,7 +8,9 @@ from rest_framework import status
 from apps.resource.models import Site, ContribSite, AuthUser
 from apps.resource.serializers import AuthUserSerializer, NestedAuthUserSerializer
 from test_fixtures import user_accountuser_account_permissions_token_fixture
+from apps.resource.tests import routines
 import test_routines
+from test_routines import request_within_budget
 
 
 class UserTestCase(LiveServerTestCase):
@@ -78,6 +80,11 @@ class UserAPITestCase(APILiveServerTestCase):
     def test_api_basic_methods(self):
         test_routines.test_api_basic_methods_routine(self, alter_data=True, count=2)
 
+    def test_list_queries(self):
+        data_list = [{'user': {'username': 'user{0}'.format(i), 'password': '123',
+                               'email': 'user{0}@teste.com'.format(i)}} for i in range(3)]
+        routines.test_resource_list_queries_routine(self, data_list)
+
     def test_admin_permission(self):
         test_routines.test_admin_permission_routine(self)
 
@@ -119,12 +126,12 @@ class UserAPITestCase(APILiveServerTestCase):
         self.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
         group_id = response.data['group']['id']
         groups = {'groups': [group_id]}
-        response = self.client.post(self.first_object_response.data['assign_groups'], groups)
+        response = request_within_budget(self, 'post', self.first_object_response.data['assign_groups'], groups)
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         user = AuthUser.objects.get(id=self.first_object_response.data['user']['id'])
         self.assertIn((group_id,), user.groups.values_list('id'))
         self.assertIn('unassign_groups', self.first_object_response.data)
-        response = self.client.post(self.first_object_response.data['unassign_groups'], groups)
+        response = request_within_budget(self, 'post', self.first_object_response.data['unassign_groups'], groups)
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         self.assertNotIn((group_id,), user.groups.values_list('id'))
 
@@ -135,13 +142,15 @@ class UserAPITestCase(APILiveServerTestCase):
         for perm in perms:
             perms_ids.append(perm.id)
         permissions = {'permissions': perms_ids}
-        response = self.client.post(self.first_object_response.data['assign_permissions'], permissions)
+        response = request_within_budget(self, 'post', self.first_object_response.data['assign_permissions'],
+                                         permissions)
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         user = AuthUser.objects.get(id=self.first_object_response.data['user']['id'])
         for perm in perms:
             self.assertIn((perm.id,), user.user_permissions.values_list('id'))
         self.assertIn('unassign_permissions', self.first_object_response.data)
-        response = self.client.post(self.first_object_response.data['unassign_permissions'], permissions)
+        response = request_within_budget(self, 'post', self.first_object_response.data['unassign_permissions'],
+                                         permissions)
         self.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
         for perm in perms:
             self.assertNotIn((perm.id,), user.user_permissions.values_list('id'))
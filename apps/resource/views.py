@@ -1,15 +1,31 @@
+import hashlib
+from functools import partial
+
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.sites.models import Site as ContribSite
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import FormView
 from django.core.exceptions import ObjectDoesNotExist
-from rest_framework import viewsets, status
+from django.core.urlresolvers import resolve, get_script_prefix, Resolver404
+from django.db import models
+from django.utils import six
+from django.utils.encoding import force_bytes
+from django.utils.six.moves.urllib.parse import urlparse
+from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from apps.resource.cache import is_site_registered, set_site_registered, get_cached_response, set_cached_response, \
+    atomic_write, RESPONSES_TIMEOUT
+from apps.resource.conditional import get_etag, is_not_modified, set_validators
+from apps.resource.context import get_tenant_context
 from apps.resource.exceptions import BadRequestValidationError
+from apps.resource.indexes import order_by_prefix_expression
 from apps.resource.models import Resource, Site, User, Group, AuthorRestriction
+from apps.resource.pagination import CountingPaginator, CountingPaginationSerializer, CursorField, CursorPage, \
+    CursorPaginationSerializer, count_queryset, paginate_by_cursor
+from apps.resource.prefetch import apply_related_lookups
 from apps.resource.serializers import ResourceSerializer, UserSerializer, \
     GroupSerializer, AuthorRestrictionSerializer
 
@@ -34,38 +50,398 @@ class UserLoginView(FormView):
         return super(UserLoginView, self).form_valid(form)
 
 
+class AutocompleteMixin(object):
+    """Serves the autocomplete URL of a list, with the id and label of the objects whose label starts with the "q"
+    query parameter, ignoring case.
+
+    The label is the autocomplete field, which must have a prefix index. Objects are filtered by the filter backends of
+    the list and ordered by label. At most "limit" objects are returned.
+    """
+    autocomplete_field = None
+    autocomplete_limit = 10
+    max_autocomplete_limit = 50
+
+    def get_autocomplete_limit(self):
+        try:
+            limit = int(self.request.QUERY_PARAMS.get('limit', self.autocomplete_limit))
+        except ValueError:
+            return self.autocomplete_limit
+        return max(1, min(limit, self.max_autocomplete_limit))
+
+    def autocomplete(self, request, *args, **kwargs):
+        prefix = request.QUERY_PARAMS.get('q', '').strip()
+        if not prefix:
+            return Response([])
+        field = self.autocomplete_field
+        queryset = self.filter_queryset(self.model._default_manager.all())
+        queryset = order_by_prefix_expression(queryset.filter(**{'{0}__prefix'.format(field): prefix}), field)
+        return Response([{'id': pk, 'label': label}
+                         for pk, label in queryset.values_list('pk', field)[:self.get_autocomplete_limit()]])
+
+
 class ResourceViewSet(viewsets.ModelViewSet):
     model = Resource
     serializer_class = ResourceSerializer
+    # Maximum number of SQL queries of each action, asserted by the test routines and logged by QueryCountMiddleware.
+    # Actions handling many items have a number of queries for the request and another for each item.
+    query_budget = {
+        'list': 12,
+        'retrieve': 11,
+        'create': 21,
+        'update': 21,
+        'partial_update': 18,
+        'destroy': 14,
+        'autocomplete': 7,
+        'bulk_create': (10, 8),
+        'bulk_update': (11, 8),
+        'bulk_destroy': (9, 11),
+    }
+    # Ordering of the cursor pages, served instead of numbered pages when the request has the cursor parameter.
+    # The last field must be unique.
+    cursor_ordering = ('-creation_date', '-id')
+    pagination_serializer_class = CountingPaginationSerializer
+    # Lists the query planner expects to hold at least this number of objects get its estimate as count
+    count_estimate_threshold = 100000
+    # Read responses are cached until a resource of the owner changes
+    cache_responses = False
+
+    def get_queryset(self):
+        """Returns the queryset, joining or prefetching the relations rendered by the serializer on reads.
+
+        Columns needed by no rendered field are deferred, except the ones cursor pages are ordered by.
+        """
+        queryset = super(ResourceViewSet, self).get_queryset()
+        if self.request.method in permissions.SAFE_METHODS:
+            serializer = self.get_serializer()
+            queryset = apply_related_lookups(queryset, serializer)
+            ordering_fields = [name.lstrip('-') for name in self.cursor_ordering or ()]
+            deferred_fields = [name for name in getattr(serializer, 'deferred_fields', ())
+                               if name not in ordering_fields]
+            if deferred_fields:
+                # defer() ignores the fields of the parents of the parent model, only() does not
+                queryset = queryset.only(*[field.name for field in queryset.model._meta.concrete_fields
+                                           if field.name not in deferred_fields])
+        return queryset
+
+    def get_serializer_options(self):
+        """Returns the fields and relations to expand asked for by the "fields" and "expand" query parameters.
+
+        Both are comma separated lists of field names, and only apply to reads.
+        """
+        options = {}
+        if self.request.method in permissions.SAFE_METHODS:
+            for option in ('fields', 'expand'):
+                value = self.request.QUERY_PARAMS.get(option)
+                if value:
+                    options[option] = [name.strip() for name in value.split(',') if name.strip()]
+        return options
+
+    def get_serializer(self, instance=None, data=None, files=None, many=False, partial=False,
+                       allow_add_remove=False):
+        serializer_class = self.get_serializer_class()
+        return serializer_class(instance, data=data, files=files, many=many, partial=partial,
+                                allow_add_remove=allow_add_remove, context=self.get_serializer_context(),
+                                **self.get_serializer_options())
+
+    def list(self, request, *args, **kwargs):
+        """Lists the objects, or returns 304 if the client holds the current list.
+
+        The list is validated by an ETag of its latest modification date and its count, which is then reused by the
+        paginator. Deletions do not move the latest modification date, so lists are sent without a Last-Modified date.
+        """
+        def get_validators():
+            self.object_list = self.filter_queryset(self.get_queryset())
+            last_modified = self.get_list_last_modified(self.object_list)
+            count, exact = count_queryset(self.object_list, get_tenant_context(request).owner_id,
+                                          self.count_estimate_threshold)
+            return get_etag(request, self.__class__.__name__, count, last_modified), None
+
+        def get_response():
+            page = self.paginate_queryset(self.object_list)
+            if page is not None:
+                serializer = self.get_pagination_serializer(page)
+            else:
+                serializer = self.get_serializer(self.object_list, many=True)
+            return Response(serializer.data)
+
+        return self.get_conditional_response(get_validators, get_response)
+
+    def get_list_last_modified(self, queryset):
+        """Returns the date of the last change of the objects of the list, which validates it with its count."""
+        return queryset.order_by().aggregate(models.Max('last_modification_date'))['last_modification_date__max']
+
+    def retrieve(self, request, *args, **kwargs):
+        """Returns the object, or 304 if the client holds its current representation."""
+        def get_validators():
+            self.object = self.get_object()
+            last_modified = self.object.get_last_modified()
+            return get_etag(request, self.__class__.__name__, self.object.pk, last_modified), last_modified
+
+        return self.get_conditional_response(get_validators, lambda: Response(self.get_serializer(self.object).data))
+
+    def get_conditional_response(self, get_validators, get_response):
+        """Returns the response built by get_response with its validators, or 304 if the client already holds it.
+
+        If the viewset caches responses, the data and validators are read from the cache when they are there, so
+        neither the filters nor the serializer run.
+        """
+        fingerprint = self.get_response_fingerprint() if self.cache_responses else None
+        owner_id = get_tenant_context(self.request).owner_id
+        cached = fingerprint and get_cached_response(owner_id, fingerprint)
+        if cached:
+            data, etag, last_modified = cached
+        else:
+            etag, last_modified = get_validators()
+        if is_not_modified(self.request, etag, last_modified):
+            return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+        if cached:
+            response = Response(data)
+        else:
+            response = get_response()
+            if fingerprint and response.status_code == status.HTTP_200_OK:
+                set_cached_response(owner_id, fingerprint, response.data, etag, last_modified,
+                                    self.get_response_cache_timeout())
+        return set_validators(response, etag, last_modified)
+
+    def get_response_cache_timeout(self):
+        """Returns the number of seconds the read responses of the owner stay valid without changes being saved."""
+        return RESPONSES_TIMEOUT
+
+    def get_response_fingerprint(self):
+        """Returns a hash of everything a read response depends on, besides the data of the owner.
+
+        That is the site, the user and its permissions, the viewset, the path and the query parameters.
+        """
+        context = get_tenant_context(self.request)
+        query = sorted((key, sorted(values)) for key, values in self.request.QUERY_PARAMS.lists())
+        key = [context.domain, context.site_id, context.user.pk, sorted(context.permissions), self.__class__.__name__,
+               self.request.path, query]
+        return hashlib.md5(force_bytes(repr(key))).hexdigest()
+
+    @property
+    def paginator_class(self):
+        """Paginator of numbered pages, counting the lists of the request owner with cached or estimated counts."""
+        return partial(CountingPaginator, owner_id=get_tenant_context(self.request).owner_id,
+                       estimate_threshold=self.count_estimate_threshold)
+
+    def paginate_queryset(self, queryset, page_size=None):
+        """Returns a cursor page if the request has the cursor parameter, or a numbered page otherwise.
+
+        Cursor pages are read from the position of the previous page, so they have no count and deep pages are as
+        fast as the first one. The first page is requested with an empty cursor.
+        """
+        cursor = self.request.QUERY_PARAMS.get(CursorField.cursor_field)
+        if cursor is None or page_size is not None or not self.cursor_ordering:
+            return super(ResourceViewSet, self).paginate_queryset(queryset, page_size)
+        page_size = self.get_paginate_by()
+        if not page_size:
+            return None
+        return paginate_by_cursor(queryset, self.cursor_ordering, page_size, cursor)
+
+    def get_pagination_serializer(self, page):
+        if isinstance(page, CursorPage):
+            pagination_serializer_class = CursorPaginationSerializer
+        else:
+            pagination_serializer_class = self.pagination_serializer_class
+        serializer_class = partial(self.get_serializer_class(), **self.get_serializer_options())
+
+        class SerializerClass(pagination_serializer_class):
+            class Meta:
+                object_serializer_class = serializer_class
+
+        return SerializerClass(instance=page, context=self.get_serializer_context())
+
+    def create(self, request, *args, **kwargs):
+        self.warm_site_cache()
+        with atomic_write():
+            if isinstance(request.DATA, list):
+                return self.bulk_create(request, *args, **kwargs)
+            return super(ResourceViewSet, self).create(request, *args, **kwargs)
+
+    def bulk_create(self, request, *args, **kwargs):
+        """Creates the objects of a list, all of them or none."""
+        self.query_budget_items = len(request.DATA)
+        serializer = self.get_serializer(data=request.DATA, files=request.FILES, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Each object is saved before the next pre_save, which may look for conflicts among the saved ones
+        for obj in serializer.object:
+            self.pre_save(obj)
+            serializer.save_object(obj, force_insert=True)
+        self.object_list = serializer.object
+        self.post_bulk_save(self.object_list, created=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        """Partially updates the objects of a list, identified by their "id" or "url" keys, all of them or none."""
+        if not isinstance(request.DATA, list):
+            return Response(data={'detail': _('Expected a list of items.')}, status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(request.DATA)
+        pks = [self.get_bulk_pk(item) for item in request.DATA]
+        objects = self.get_bulk_objects(pks)
+        serializers = []
+        errors = []
+        for item, pk in zip(request.DATA, pks):
+            if pk not in objects or not isinstance(item, dict):
+                errors.append({'non_field_errors': [_('Item not found.')]})
+                continue
+            serializer = self.get_serializer(objects[pk], data=item, partial=True)
+            errors.append(serializer.errors)
+            serializers.append(serializer)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        self.warm_site_cache()
+        with atomic_write():
+            self.object_list = []
+            for serializer in serializers:
+                self.pre_save(serializer.object)
+                self.object_list.append(serializer.save(force_update=True))
+            self.post_bulk_save(self.object_list, created=False)
+        return Response([serializer.data for serializer in serializers])
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        """Deletes the objects of a list of ids or urls, all of them or none."""
+        if not isinstance(request.DATA, list):
+            return Response(data={'detail': _('Expected a list of items.')}, status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(request.DATA)
+        pks = [self.get_bulk_pk(item) for item in request.DATA]
+        objects = self.get_bulk_objects(pks)
+        not_found = [item for item, pk in zip(request.DATA, pks) if pk not in objects]
+        if not_found:
+            return Response(data={'detail': _('Items not found.'), 'items': not_found},
+                            status=status.HTTP_404_NOT_FOUND)
+        with atomic_write():
+            for obj in objects.values():
+                self.pre_delete(obj)
+            if six.get_unbound_function(self.model.delete) is six.get_unbound_function(models.Model.delete):
+                self.model._default_manager.filter(pk__in=list(objects)).delete()
+            else:
+                # The model has its own deletion logic, which a queryset deletion would skip
+                for obj in objects.values():
+                    obj.delete()
+            for obj in objects.values():
+                self.post_delete(obj)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_bulk_pk(self, item):
+        """Returns the primary key of an item of a bulk request, given by its id or url, or None if it is invalid."""
+        if isinstance(item, dict):
+            item = item.get('id', item.get('url'))
+        if isinstance(item, six.string_types) and not item.isdigit():
+            path = urlparse(item).path
+            prefix = get_script_prefix()
+            if path.startswith(prefix):
+                path = '/' + path[len(prefix):]
+            try:
+                match = resolve(path)
+            except Resolver404:
+                return None
+            if getattr(match.func, 'cls', None) is not self.__class__:
+                return None
+            item = match.kwargs.get(self.lookup_field)
+        try:
+            return int(item)
+        except (TypeError, ValueError):
+            return None
+
+    def get_bulk_objects(self, pks):
+        """Returns a dict of the objects with the given primary keys that the request user can access."""
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related('sites')
+        objects = queryset.in_bulk([pk for pk in pks if pk is not None])
+        for obj in objects.values():
+            self.check_object_permissions(self.request, obj)
+        return objects
+
+    def update(self, request, *args, **kwargs):
+        self.warm_site_cache()
+        with atomic_write():
+            return super(ResourceViewSet, self).update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        # Deletions run in a transaction, which sends the deletion signals before it is committed
+        with atomic_write():
+            return super(ResourceViewSet, self).destroy(request, *args, **kwargs)
+
+    def warm_site_cache(self):
+        """Resolves the request site before the write transaction starts, as lookups made inside it are not cached."""
+        context = get_tenant_context(self.request)
+        try:
+            self.get_site_id(context.owner_id)
+        except User.DoesNotExist:
+            pass
+
+    def get_site_id(self, owner_id, author_id=None):
+        """Returns the id of the site of the request domain, registered for the owner.
+
+        If an author is given, a missing site or registration is created on its behalf. Otherwise None is returned
+        when the site is not registered for the owner.
+        """
+        context = get_tenant_context(self.request)
+        if context.site_id is None:
+            if author_id is None:
+                return None
+            context.site_id = ContribSite.objects.create(domain=context.domain).id
+        if not is_site_registered(owner_id, context.site_id):
+            if Site.objects.filter(site=context.site_id, owner=owner_id).exists():
+                set_site_registered(owner_id, context.site_id)
+            elif author_id is None:
+                return None
+            else:
+                Site.objects.create(site_id=context.site_id, owner_id=owner_id, author_id=author_id)
+        return context.site_id
 
     def pre_save(self, obj):
         """Checks if there is a author and account for the resource.
 
         Does nothing if it has, assigns the request user and its account to the object otherwise.
+        Objects saved without sites are attached to the site of the request.
         """
         try:
             obj.author
             obj.owner
         except ObjectDoesNotExist:
             obj.author = self.request.user
-            obj.owner = self.request.user.user.owner
+            obj.owner = get_tenant_context(self.request).owner
+        m2m_data = getattr(obj, '_m2m_data', {})
+        if 'sites' not in m2m_data:
+            # Partial updates keep the current sites
+            obj._attach_site = obj.pk is None or not obj.sites.exists()
+        elif not m2m_data['sites']:
+            if obj.pk is None:
+                # There is nothing to clear in a new object, the site is inserted after it is saved
+                del m2m_data['sites']
+                obj._attach_site = True
+            else:
+                m2m_data['sites'] = [self.get_site_id(obj.owner_id, obj.author_id)]
 
     def post_save(self, obj, created=False):
-        if not obj.sites.all():
-            domain = self.request.META.get('HTTP_HOST')
-            if not domain:
-                domain = self.request.META.get('SERVER_NAME')
-            site, created = ContribSite.objects.get_or_create(domain=domain)
-            try:
-                Site.objects.get(site=site, owner=obj.owner)
-            except ObjectDoesNotExist:
-                Site.objects.create(site=site, owner=obj.owner, author=obj.author)
-            obj.sites.add(site)
+        if getattr(obj, '_attach_site', False):
+            del obj._attach_site
+            site_id = self.get_site_id(obj.owner_id, obj.author_id)
+            obj.sites.through.objects.create(resource_id=obj.pk, site_id=site_id)
+
+    def post_bulk_save(self, objects, created=False):
+        """Attaches the request site to the objects saved without sites in one insert, then calls post_save."""
+        site_ids = {}
+        relations = []
+        for obj in objects:
+            if getattr(obj, '_attach_site', False):
+                del obj._attach_site
+                if obj.owner_id not in site_ids:
+                    site_ids[obj.owner_id] = self.get_site_id(obj.owner_id, obj.author_id)
+                relations.append(self.model.sites.through(resource_id=obj.pk, site_id=site_ids[obj.owner_id]))
+        self.model.sites.through.objects.bulk_create(relations)
+        for obj in objects:
+            # The relations prefetched when looking the object up may have changed
+            getattr(obj, '_prefetched_objects_cache', {}).clear()
+            self.post_save(obj, created=created)
 
 
 class UserViewSet(ResourceViewSet):
     model = User
     serializer_class = UserSerializer
+    query_budget = dict(ResourceViewSet.query_budget, assign_groups=(10, 3), unassign_groups=(10, 2),
+                        assign_permissions=(11, 3), unassign_permissions=(9, 2))
 
     @action()
     def assign_groups(self, request, *args, **kwargs):
@@ -80,6 +456,7 @@ class UserViewSet(ResourceViewSet):
             return Response(
                 data={'detail': _('You must define the groups through dict key "groups".')},
                 status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(groups_to_assign)
         for group in groups_to_assign:
             user.groups.add(group)
         return Response(data={'assigned_groups': groups_to_assign})
@@ -97,6 +474,7 @@ class UserViewSet(ResourceViewSet):
             return Response(
                 data={'detail': _('You must define the groups through dict key "groups".')},
                 status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(groups_to_unassign)
         for group in groups_to_unassign:
             user.groups.remove(group)
         return Response(data={'unassigned_groups': groups_to_unassign})
@@ -114,6 +492,7 @@ class UserViewSet(ResourceViewSet):
             return Response(
                 data={'detail': _('You must define the permissions through dict key "permissions".')},
                 status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(permissions_to_assign)
         for permission in permissions_to_assign:
             user.user_permissions.add(permission)
         return Response(data={'assigned_permissions': permissions_to_assign})
@@ -131,6 +510,7 @@ class UserViewSet(ResourceViewSet):
             return Response(
                 data={'detail': _('You must define the permissions to assign through dict key "permissions".')},
                 status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(permissions_to_unassign)
         for permission in permissions_to_unassign:
             user.user_permissions.remove(permission)
         return Response(data={'unassigned_permissions': permissions_to_unassign})
@@ -140,10 +520,11 @@ class GroupViewSet(ResourceViewSet):
     model = Group
     serializer_class = GroupSerializer
     search_fields = ['role']
+    query_budget = dict(ResourceViewSet.query_budget, assign_permissions=(7, 3), unassign_permissions=(7, 2))
 
     def pre_save(self, obj):
         try:
-            Group.objects.get(owner=self.request.user.user.owner, role=obj.role)
+            Group.objects.get(owner=get_tenant_context(self.request).owner_id, role=obj.role)
             raise BadRequestValidationError(_('Role field is unique. Please insert another name.'))
         except ObjectDoesNotExist:
             super(GroupViewSet, self).pre_save(obj)
@@ -157,6 +538,7 @@ class GroupViewSet(ResourceViewSet):
             return Response(
                 data={'detail': _('You must define the permissions through dict key "permissions".')},
                 status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(permissions_to_assign)
         for permission in permissions_to_assign:
             group.group.permissions.add(permission)
         return Response(data={'assigned_permissions': permissions_to_assign})
@@ -170,6 +552,7 @@ class GroupViewSet(ResourceViewSet):
             return Response(
                 data={'detail': _('You must define the permissions to assign through dict key "permissions".')},
                 status=status.HTTP_400_BAD_REQUEST)
+        self.query_budget_items = len(permissions_to_unassign)
         for permission in permissions_to_unassign:
             group.group.permissions.remove(permission)
         return Response(data={'unassigned_permissions': permissions_to_unassign})
@@ -177,4 +560,5 @@ class GroupViewSet(ResourceViewSet):
 
 class AuthorRestrictionViewSet(ResourceViewSet):
     model = AuthorRestriction
-    serializer_class = AuthorRestrictionSerializer
\ No newline at end of file
+    serializer_class = AuthorRestrictionSerializer
+    query_budget = dict(ResourceViewSet.query_budget, create=24, update=23, partial_update=20, destroy=17)
\ No newline at end of file
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
+import logging
 import pytz
 
+from django.db import connection
 from django.utils import timezone
 
+from apps.resource.queries import QueryRecorder, get_query_budget
+
+logger = logging.getLogger(__name__)
+
 
 class TimezoneMiddleware(object):
 
@@ -11,4 +17,31 @@ class TimezoneMiddleware(object):
         if tzname:
             timezone.activate(pytz.timezone(tzname))
         else:
-            timezone.deactivate()
\ No newline at end of file
+            timezone.deactivate()
+
+
+class QueryCountMiddleware(object):
+    """Logs the number of SQL queries and the database time of each request.
+
+    Requests going over the query budget of their viewset action are logged as warnings.
+    """
+
+    def process_request(self, request):
+        request.query_recorder = QueryRecorder(connection)
+        request.query_recorder.__enter__()
+
+    def process_response(self, request, response):
+        recorder = getattr(request, 'query_recorder', None)
+        if recorder is None:
+            return response
+        recorder.__exit__(None, None, None)
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.url_name if resolver_match else request.path
+        budget = get_query_budget(response, request.method)
+        message = '%s %s: %d queries, %.1f ms'
+        args = [request.method, route, recorder.count, recorder.duration * 1000]
+        if budget is not None and recorder.count > budget:
+            logger.warning(message + ', over the budget of %d', *(args + [budget]))
+        else:
+            logger.info(message, *args)
+        return response
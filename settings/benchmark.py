@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from settings.common import *
+
+# Queries are not kept in memory while the benchmark runs
+DEBUG = False
+
+# SQLite is used unless DATABASE_URL points to another database, like postgres://localhost/sites
+if os.environ.get('DATABASE_URL'):
+    from postgresify import postgresify
+    DATABASES = postgresify()
+
+CACHES = LOCAL_CACHES
@@ -87,6 +87,9 @@ DATABASES = {
 
 LANGUAGE_CODE = 'pt-br'
 
+# Text search configuration of PostgreSQL full-text indexes, stemming the words of the language of the site
+FULL_TEXT_SEARCH_CONFIG = 'portuguese'
+
 TIME_ZONE = 'America/Sao_Paulo'
 
 USE_I18N = True
@@ -109,8 +112,8 @@ OAUTH2_PROVIDER = {
 }
 
 DJANGO_FILTERS = (
-    'rest_framework.filters.DjangoFilterBackend',
-    'rest_framework.filters.SearchFilter',
+    'apps.resource.backends.TenantFilterBackend',
+    'apps.resource.backends.FullTextSearchFilter',
     'rest_framework.filters.OrderingFilter',
 )
 
@@ -152,6 +155,17 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# Caches author restrictions, list counts and API responses in the memory of the single process serving them.
+# Versions of cached keys are bumped in the process handling each write, so deployments with several processes
+# must share a cache instead.
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # The default of 300 keys is reached by the cached responses of a few lists, and culls a third of the keys
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 ########## LOGGING CONFIGURATION
 # See: https://docs.djangoproject.com/en/dev/ref/settings/#logging
 LOGGING = {
@@ -1,2 +1,4 @@
 # -*- coding: utf-8 -*-
-from settings.common import *
\ No newline at end of file
+from settings.common import *
+
+CACHES = LOCAL_CACHES
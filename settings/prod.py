@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from settings.common import *
+from memcacheify import memcacheify
 from postgresify import postgresify
 from S3 import CallingFormat
 
@@ -18,6 +19,22 @@ MIDDLEWARE_CLASSES = ('sslify.middleware.SSLifyMiddleware',) + MIDDLEWARE_CLASSE
 DATABASES = postgresify()
 ########## END DATABASE CONFIGURATION
 
+
+########## CACHE CONFIGURATION
+# Every worker reads the versions of cached keys that other workers bump on writes, so they share memcached.
+# See: https://github.com/rdegges/django-heroku-memcacheify
+CACHES = memcacheify()
+
+# Without a memcached add-on, memcacheify falls back to the local memory of each worker, whose cached author
+# restrictions and responses would outlive the writes made by other workers. Nothing is cached then.
+if CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+    }
+########## END CACHE CONFIGURATION
+
 # See: http://django-storages.readthedocs.org/en/latest/backends/amazon-S3.html#settings
 STATICFILES_STORAGE = DEFAULT_FILE_STORAGE = 'storages.backends.s3boto.S3BotoStorage'
 
@@ -18,4 +18,10 @@ REST_FRAMEWORK = {
         'apps.resource.backends.CustomDjangoModelPermissions',
     ),
     'DEFAULT_FILTER_BACKENDS': OTHER_FILTERS + DJANGO_FILTERS
-}
\ No newline at end of file
+}
+MIDDLEWARE_CLASSES += ('middleware.QueryCountMiddleware',)
+
+LOGGING['loggers']['middleware'] = {
+    'handlers': ['console'],
+    'level': 'INFO',
+}
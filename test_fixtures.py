@@ -1,10 +1,19 @@
 # -*- coding: utf-8 -*-
+import random
 from itertools import chain
 from datetime import timedelta
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site as ContribSite
+from django.db import transaction
 from django.utils import timezone
 from oauth2_provider.models import Application, AccessToken
-from apps.resource.models import Group, User as CustomUser, AuthorRestriction
+from apps.category.models import Category
+from apps.cms.models import Page
+from apps.news.models import News
+from apps.newsletter.models import Subscription
+from apps.resource.models import Group, Resource, Site, User as CustomUser, AuthorRestriction
 
 
 class Fixtures:
@@ -97,4 +106,131 @@ def user_account_token_fixture(test_case):
     second_owner_application = create_user_application(fixture.second_owner)
     test_case.owner_token = create_user_access_token(fixture.owner, owner_application)
     test_case.second_owner_token = create_user_access_token(fixture.second_owner, second_owner_application)
-    test_case.account_user_token = create_user_access_token(owner_user, owner_application)
\ No newline at end of file
+    test_case.account_user_token = create_user_access_token(owner_user, owner_application)
+
+
+class ScaledFixtures(Fixtures):
+    """Creates the fixtures scaled to any number of owners, for benchmarks.
+
+    Each owner gets its own users, sites, category trees, news, pages, subscriptions and author restrictions, so
+    the number of rows of every table grows with the number of owners. The tables no other model inherits from or
+    saves on are filled with bulk inserts. Resources inherit their table, so they are still created one by one.
+    """
+
+    def __init__(self, test_case, owners=2, users=5, sites=5, categories=100, category_depth=5, publications=1000,
+                 pages=10, subscriptions=1000, restrictions=10, sites_per_resource=2,
+                 categories_per_publication=2):
+        Fixtures.__init__(self, test_case)
+        self.owners = owners
+        self.users = users
+        self.sites = sites
+        self.categories = categories
+        self.category_depth = category_depth
+        self.publications = publications
+        self.pages = pages
+        self.subscriptions = subscriptions
+        self.restrictions = restrictions
+        self.sites_per_resource = sites_per_resource
+        self.categories_per_publication = categories_per_publication
+        self.random = random.Random(0)
+        # Hashing is slow on purpose, so every user gets the same hash
+        self.password = make_password('123')
+        self.tokens = []
+        self.owner_ids = {}
+        self.domains = {}
+
+    def create(self):
+        """Creates the data of all owners. Returns the access token of each owner."""
+        permissions = list(Permission.objects.filter(content_type__app_label__in=(
+            'resource', 'category', 'publication', 'news', 'newsletter', 'cms', 'file_explorer')))
+        for number in range(self.owners):
+            with transaction.atomic():
+                self.create_owner_data(number, permissions)
+        self.test_case.tokens = self.tokens
+        return self.tokens
+
+    def create_owner_data(self, number, permissions):
+        owner = User.objects.create_user('owner{0}'.format(number), 'owner{0}@owner.com'.format(number), '123')
+        owner.user_permissions.add(*permissions)
+        domains = ['site{0}.owner{1}.com'.format(site_number, number) for site_number in range(self.sites)]
+        ContribSite.objects.bulk_create([ContribSite(domain=domain, name=domain) for domain in domains])
+        site_ids = list(ContribSite.objects.filter(domain__in=domains).order_by('id').values_list('id', flat=True))
+        for site_id in site_ids:
+            Site.objects.create(site_id=site_id, owner=owner, author=owner)
+        resource_ids = [CustomUser.objects.create(owner=owner, user=owner, author=owner).id]
+        usernames = ['owner{0}_user{1}'.format(number, user_number) for user_number in range(self.users)]
+        User.objects.bulk_create([User(username=username, email='{0}@owner.com'.format(username),
+                                       password=self.password) for username in usernames])
+        users = list(User.objects.filter(username__in=usernames).order_by('id'))
+        for user in users:
+            resource_ids.append(CustomUser.objects.create(owner=owner, user=user, author=owner).id)
+        authors = [owner] + users
+        if users:
+            for restriction_number in range(self.restrictions):
+                filter_values = ','.join(str(author.id) for author in self.random.sample(authors, min(3, len(authors))))
+                resource_ids.append(AuthorRestriction.objects.create(
+                    permission=permissions[restriction_number % len(permissions)], owner=owner, author=owner,
+                    user=users[restriction_number % len(users)], filter_values=filter_values).id)
+        category_ids = self.create_categories(owner)
+        resource_ids.extend(category_ids)
+        resource_ids.extend(self.create_news(owner, authors, category_ids))
+        for page_number in range(self.pages):
+            page = Page.objects.create(owner=owner, author=owner, title='Page {0}'.format(page_number),
+                                       content='Content', slug='owner{0}-page-{1}'.format(number, page_number))
+            resource_ids.extend([page.id, page.category_id])
+        for subscription_number in range(self.subscriptions):
+            resource_ids.append(Subscription.objects.create(
+                owner=owner, author=owner, name='Subscriber {0}'.format(subscription_number),
+                email='subscriber{0}@owner{1}.com'.format(subscription_number, number)).id)
+        self.attach_sites(resource_ids, site_ids)
+        application = create_user_application(owner)
+        token = create_user_access_token(owner, application)
+        self.tokens.append(token)
+        self.owner_ids[token] = owner.id
+        self.domains[token] = domains
+
+    def create_categories(self, owner):
+        """Creates trees of categories as deep as the category depth. Returns the ids of the categories."""
+        content_type = ContentType.objects.get_for_model(News)
+        levels = [[] for level in range(max(self.category_depth, 1))]
+        category_ids = []
+        with Category._tree_manager.delay_mptt_updates():
+            for category_number in range(self.categories):
+                level = category_number % len(levels)
+                parents = levels[level - 1] if level else []
+                parent = self.random.choice(parents) if parents else None
+                category = Category.objects.create(owner=owner, author=owner, model=content_type, parent=parent,
+                                                   name='Category {0}'.format(category_number))
+                levels[level].append(category)
+                category_ids.append(category.id)
+        return category_ids
+
+    def create_news(self, owner, authors, category_ids):
+        """Creates news written by random authors in random categories. Returns the ids of the news."""
+        news_ids = []
+        category_relations = []
+        for publication_number in range(self.publications):
+            news = News.objects.create(owner=owner, author=self.random.choice(authors), content='Content',
+                                       title='News {0}'.format(publication_number),
+                                       slug='news-{0}'.format(publication_number))
+            news_ids.append(news.id)
+            for category_id in self.random.sample(category_ids,
+                                                  min(self.categories_per_publication, len(category_ids))):
+                category_relations.append(News.categories.through(news_id=news.id, category_id=category_id))
+        News.categories.through.objects.bulk_create(category_relations)
+        return news_ids
+
+    def attach_sites(self, resource_ids, site_ids):
+        """Publishes each resource in random sites of its owner, as the API does on creation."""
+        through = Resource.sites.through
+        relations = []
+        for resource_id in resource_ids:
+            for site_id in self.random.sample(site_ids, min(self.sites_per_resource, len(site_ids))):
+                relations.append(through(resource_id=resource_id, site_id=site_id))
+        through.objects.bulk_create(relations)
+
+
+def scaled_fixture(test_case, **options):
+    fixture = ScaledFixtures(test_case, **options)
+    fixture.create()
+    return fixture
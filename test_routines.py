@@ -1,8 +1,24 @@
 # -*- coding: utf-8 -*-
 import random
 from django.contrib.auth.models import Permission
+from django.db import connection
 from rest_framework import status
 
+from apps.resource.queries import QueryRecorder, get_response_view, get_view_action, get_query_budget
+
+
+def request_within_budget(test_case, method, url, data=None):
+    """Makes a request with the test client, failing if it runs more queries than the budget of its endpoint."""
+    with QueryRecorder(connection) as queries:
+        response = getattr(test_case.client, method)(url, data)
+    action = get_view_action(get_response_view(response), method)
+    if action is not None:
+        budget = get_query_budget(response, method)
+        test_case.assertIsNotNone(budget, 'There is no query budget for the action "{0}"'.format(action))
+        message = 'The action "{0}" ran {1} queries, over its budget of {2}'.format(action, queries.count, budget)
+        test_case.assertLessEqual(queries.count, budget, message)
+    return response
+
 
 def test_api_basic_methods_routine(test_case, token=None, count=2, object_url=None, alter_data=False):
     if not token:
@@ -15,32 +31,32 @@ def test_api_basic_methods_routine(test_case, token=None, count=2, object_url=No
     # Test POST
     if alter_data:
         test_case.alter_data()
-    response = test_case.client.post(test_case.url, test_case.data)
+    response = request_within_budget(test_case, 'post', test_case.url, test_case.data)
     test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
 
     # Test PUT
     if alter_data:
         test_case.alter_data(altered_data=True)
-    response = test_case.client.put(object_url, test_case.altered_data)
+    response = request_within_budget(test_case, 'put', object_url, test_case.altered_data)
     test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
 
     # Test PATCH
     if alter_data:
         test_case.alter_data(altered_data=True)
-    response = test_case.client.patch(object_url, test_case.altered_data)
+    response = request_within_budget(test_case, 'patch', object_url, test_case.altered_data)
     test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
 
     # Test RETRIEVE
-    response = test_case.client.get(object_url)
+    response = request_within_budget(test_case, 'get', object_url)
     test_case.assertEqual(status.HTTP_200_OK, response.status_code, response.data)
 
     # Test LIST
-    response = test_case.client.get(test_case.url)
+    response = request_within_budget(test_case, 'get', test_case.url)
     test_case.assertEqual(status.HTTP_200_OK, response.status_code)
     test_case.assertEqual(count, response.data['count'])
 
     # Test DELETE
-    response = test_case.client.delete(object_url)
+    response = request_within_budget(test_case, 'delete', object_url)
     test_case.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code, response.data)
     
 
@@ -49,29 +65,31 @@ def test_admin_permission_routine(test_case, token=None):
         token = test_case.account_user_token
     test_case.set_authorization_bearer(token)
 
-    response = test_case.client.post(test_case.url, test_case.data)
+    response = request_within_budget(test_case, 'post', test_case.url, test_case.data)
     test_case.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
 
-    response2 = test_case.client.put(test_case.first_object_response.data['url'], test_case.altered_data)
+    response2 = request_within_budget(test_case, 'put', test_case.first_object_response.data['url'],
+                                      test_case.altered_data)
     test_case.assertEqual(status.HTTP_403_FORBIDDEN, response2.status_code)
 
-    response3 = test_case.client.patch(test_case.first_object_response.data['url'], test_case.altered_data)
+    response3 = request_within_budget(test_case, 'patch', test_case.first_object_response.data['url'],
+                                      test_case.altered_data)
     test_case.assertEqual(status.HTTP_403_FORBIDDEN, response3.status_code)
 
-    response4 = test_case.client.get(test_case.first_object_response.data['url'])
+    response4 = request_within_budget(test_case, 'get', test_case.first_object_response.data['url'])
     test_case.assertEqual(status.HTTP_403_FORBIDDEN, response4.status_code)
 
-    response5 = test_case.client.get(test_case.url)
+    response5 = request_within_budget(test_case, 'get', test_case.url)
     test_case.assertEqual(status.HTTP_403_FORBIDDEN, response5.status_code)
 
-    response6 = test_case.client.delete(test_case.first_object_response.data['url'])
+    response6 = request_within_budget(test_case, 'delete', test_case.first_object_response.data['url'])
     test_case.assertEqual(status.HTTP_403_FORBIDDEN, response6.status_code)
 
 
 def test_serializer_hyperlinked_fields_routine(test_case, fields):
     fields.extend(['url'])
     for field in fields:
-        response = test_case.client.get(test_case.first_object_response.data[field])
+        response = request_within_budget(test_case, 'get', test_case.first_object_response.data[field])
         test_case.assertEqual(response.status_code, status.HTTP_200_OK, 'Error with field {0}'.format(field))
 
 
@@ -92,9 +110,9 @@ def test_search_fields_routine(test_case, search_fields):
     for field in search_fields:
         filter_parameter = random.randint(1, 999999)
         test_case.altered_data.update({field: filter_parameter})
-        test_case.client.post(test_case.url, test_case.altered_data)
+        request_within_budget(test_case, 'post', test_case.url, test_case.altered_data)
         query_parameter = {'search': filter_parameter}
-        response = test_case.client.get(test_case.url, query_parameter)
+        response = request_within_budget(test_case, 'get', test_case.url, query_parameter)
         test_case.assertEqual(1, response.data['count'], 'Field "{0}" not in search fields'.format(field))
 
 
@@ -124,23 +142,25 @@ def test_resource_permission_routine(test_case, token=None, count=2, alter_data=
 
     if alter_data:
         test_case.alter_data()
-    response = test_case.client.post(test_case.url, test_case.data)
+    response = request_within_budget(test_case, 'post', test_case.url, test_case.data)
     test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
 
     if alter_data:
         test_case.alter_data(altered_data=True)
-    response = test_case.client.put(test_case.first_object_response.data['url'], test_case.altered_data)
+    response = request_within_budget(test_case, 'put', test_case.first_object_response.data['url'],
+                                     test_case.altered_data)
     test_case.assertEqual(status.HTTP_201_CREATED, response.status_code, response.data)
 
-    response = test_case.client.patch(test_case.first_object_response.data['url'], test_case.altered_data)
+    response = request_within_budget(test_case, 'patch', test_case.first_object_response.data['url'],
+                                     test_case.altered_data)
     test_case.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code, response.data)
 
-    response = test_case.client.get(test_case.url)
+    response = request_within_budget(test_case, 'get', test_case.url)
     test_case.assertEqual(status.HTTP_200_OK, response.status_code)
     test_case.assertEqual(count, response.data['count'])
 
-    response = test_case.client.get(test_case.first_object_response.data['url'])
+    response = request_within_budget(test_case, 'get', test_case.first_object_response.data['url'])
     test_case.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code, response.data)
 
-    response = test_case.client.delete(test_case.first_object_response.data['url'])
+    response = request_within_budget(test_case, 'delete', test_case.first_object_response.data['url'])
     test_case.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code, response.data)
\ No newline at end of file
@@ -1,18 +1,18 @@
 from django.conf.urls import patterns, url, include
 from django.contrib import admin
-from rest_framework.routers import DefaultRouter
 from apps.category.views import CategoryViewSet
 from apps.news import views as news_views
 from apps.publication import views as publication_views
 from apps.file_explorer import views as file_explorer_views
 from apps.newsletter import views as newsletter_views
 from apps.cms import views as cms_views
+from apps.resource.routers import ResourceRouter
 from apps.resource.views import UserViewSet, GroupViewSet, AuthorRestrictionViewSet
 
 
 admin.autodiscover()
 
-router = DefaultRouter()
+router = ResourceRouter()
 router.register(r'publication', publication_views.PublicationViewSet)
 router.register(r'category', CategoryViewSet)
 router.register(r'news', news_views.NewsViewSet)